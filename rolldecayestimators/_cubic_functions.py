@@ -0,0 +1,78 @@
+"""
+Lambdified functions for the estimators in direct_estimator_cubic.
+
+This file is generated by build_cubic_functions.py, do not edit it by hand!
+"""
+from numpy import abs, sign, sqrt
+
+
+def acceleration_cubic(B_1A, B_2A, B_3A, C_1A, C_3A, C_5A, phi, phi1d):
+    return -B_1A*phi1d - B_2A*phi1d*abs(phi1d) - B_3A*phi1d**3 - C_1A*phi - C_3A*phi**3 - C_5A*phi**5
+
+
+def jacobian_cubic(B_1A, B_2A, B_3A, C_1A, C_3A, C_5A, phi, phi1d):
+    return (-C_1A - 3*C_3A*phi**2 - 5*C_5A*phi**4, -B_1A - B_2A*phi1d*sign(phi1d) - B_2A*abs(phi1d) - 3*B_3A*phi1d**2)
+
+
+def gradient_cubic(B_1A, B_2A, B_3A, C_1A, C_3A, C_5A, phi, phi1d):
+    x0 = abs(phi1d)
+    return (-phi1d, -phi1d*x0, -phi1d**3, -phi, -phi**3, -phi**5, -C_1A - 3*C_3A*phi**2 - 5*C_5A*phi**4, -B_1A - B_2A*phi1d*sign(phi1d) - B_2A*x0 - 3*B_3A*phi1d**2)
+
+
+def acceleration_quadratic_b(B_1A, B_2A, C_1A, phi, phi1d):
+    return -B_1A*phi1d - B_2A*phi1d*abs(phi1d) - C_1A*phi
+
+
+def jacobian_quadratic_b(B_1A, B_2A, C_1A, phi, phi1d):
+    return (-C_1A, -B_1A - B_2A*phi1d*sign(phi1d) - B_2A*abs(phi1d))
+
+
+def gradient_quadratic_b(B_1A, B_2A, C_1A, phi, phi1d):
+    x0 = abs(phi1d)
+    return (-phi1d, -phi1d*x0, -phi, -C_1A, -B_1A - B_2A*phi1d*sign(phi1d) - B_2A*x0)
+
+
+def acceleration_quadratic_b_and_c(B_1A, B_2A, C_1A, C_3A, phi, phi1d):
+    return -B_1A*phi1d - B_2A*phi1d*abs(phi1d) - C_1A*phi - C_3A*phi**3
+
+
+def jacobian_quadratic_b_and_c(B_1A, B_2A, C_1A, C_3A, phi, phi1d):
+    return (-C_1A - 3*C_3A*phi**2, -B_1A - B_2A*phi1d*sign(phi1d) - B_2A*abs(phi1d))
+
+
+def gradient_quadratic_b_and_c(B_1A, B_2A, C_1A, C_3A, phi, phi1d):
+    x0 = abs(phi1d)
+    return (-phi1d, -phi1d*x0, -phi, -phi**3, -C_1A - 3*C_3A*phi**2, -B_1A - B_2A*phi1d*sign(phi1d) - B_2A*x0)
+
+
+def acceleration_quadratic(B_1A, B_2A, C_1A, C_3A, C_5A, phi, phi1d):
+    return -B_1A*phi1d - B_2A*phi1d*abs(phi1d) - C_1A*phi - C_3A*phi**3 - C_5A*phi**5
+
+
+def jacobian_quadratic(B_1A, B_2A, C_1A, C_3A, C_5A, phi, phi1d):
+    return (-C_1A - 3*C_3A*phi**2 - 5*C_5A*phi**4, -B_1A - B_2A*phi1d*sign(phi1d) - B_2A*abs(phi1d))
+
+
+def gradient_quadratic(B_1A, B_2A, C_1A, C_3A, C_5A, phi, phi1d):
+    x0 = abs(phi1d)
+    return (-phi1d, -phi1d*x0, -phi, -phi**3, -phi**5, -C_1A - 3*C_3A*phi**2 - 5*C_5A*phi**4, -B_1A - B_2A*phi1d*sign(phi1d) - B_2A*x0)
+
+
+def acceleration_linear(B_1A, C_1A, phi, phi1d):
+    return -B_1A*phi1d - C_1A*phi
+
+
+def jacobian_linear(B_1A, C_1A, phi, phi1d):
+    return (-C_1A, -B_1A)
+
+
+def gradient_linear(B_1A, C_1A, phi, phi1d):
+    return (-phi1d, -phi, -C_1A, -B_1A)
+
+
+def A44(C_1A, GM, g, m):
+    return GM*g*m/C_1A
+
+
+def omega0(C_1A):
+    return sqrt(C_1A)
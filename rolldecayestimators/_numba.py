@@ -0,0 +1,14 @@
+"""
+Optional numba: njit and prange fall back to plain Python when numba is not installed.
+"""
+try:
+    from numba import njit, prange
+    NUMBA = True
+except ImportError:  # numba is optional
+    NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda function: function
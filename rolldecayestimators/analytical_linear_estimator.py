@@ -6,13 +6,13 @@ import pandas as pd
 from scipy.optimize import curve_fit
 
 from sklearn.utils.validation import check_is_fitted
-import inspect
 
 from rolldecayestimators.substitute_dynamic_symbols import lambdify
 from rolldecayestimators.symbols import *
 from rolldecayestimators import equations
 
 from rolldecayestimators.direct_estimator import DirectEstimator
+from rolldecayestimators.estimator import free_parameter_names
 
 
 
@@ -41,37 +41,39 @@ class AnalyticalLinearEstimator(DirectEstimator):
 
     @property
     def parameter_names(self):
-        signature = inspect.signature(self.calculate_acceleration)
 
-        remove = ['phi_0','phi_01d', 't']
-        if not self.omega_regression:
-            remove.append('omega0')
+        if self.omega_regression:
+            remove = ('phi_0','phi_01d', 't')
+        else:
+            remove = ('phi_0','phi_01d', 't', 'omega0')
 
-        return list(set(signature.parameters.keys()) - set(remove))
+        return free_parameter_names(self.calculate_acceleration, remove)
 
-    def estimator(self, x, xs):
+    def estimator(self, x):
         parameters = {key: x for key, x in zip(self.parameter_names, x)}
 
         if not self.omega_regression:
             parameters['omega0'] = self.omega0
 
-        t = xs.index
-        phi_0 = xs.iloc[0][self.phi_key]
-        phi_01d = xs.iloc[0][self.phi1d_key]
-
-        return self.functions['phi'](t=t,phi_0=phi_0,phi_01d=phi_01d,**parameters)
+        return self.functions['phi'](t=self._t, phi_0=self._phi0, phi_01d=self._phi1d0, **parameters)
 
     def predict(self, X)->pd.DataFrame:
 
         check_is_fitted(self, 'is_fitted_')
 
         t = X.index
-        phi_0 = X.iloc[0][self.phi_key]
-        phi_01d = X.iloc[0][self.phi1d_key]
+        phi_0 = X[self.phi_key].iloc[0]
+        phi_01d = X[self.phi1d_key].iloc[0]
 
         df = pd.DataFrame(index=t)
         df['phi'] = self.functions['phi'](t=t, phi_0=phi_0, phi_01d=phi_01d, **self.parameters)
         df['phi1d'] = self.functions['velocity'](t=t, phi_0=phi_0, phi_01d=phi_01d, **self.parameters)
         df['phi2d'] = self.functions['acceleration'](t=t, phi_0=phi_0, phi_01d=phi_01d, **self.parameters)
 
-        return df
\ No newline at end of file
+        return df
+
+    def _simulate_phi(self, t, phi0, phi1d0)->np.ndarray:
+        """
+        Roll angle from the analytical solution (instead of ODE integration)
+        """
+        return np.asarray(self.functions['phi'](t=t, phi_0=phi0, phi_01d=phi1d0, **self.parameters))
@@ -0,0 +1,146 @@
+"""
+Build script for _cubic_functions.py
+
+The symbolic derivation of the roll decay equations for the estimators in direct_estimator_cubic (acceleration,
+derivatives of the acceleration, A44 and omega0) is done here once, and the lambdified functions are written as plain
+python source to _cubic_functions.py. The estimators can then be imported without any sympy work, and the compiled
+(numba) versions of the functions can be cached on disk.
+
+Run this script again if any of the equations are changed:
+
+    python -m rolldecayestimators.build_cubic_functions
+
+"""
+import os
+import inspect
+from functools import lru_cache
+import sympy as sp
+
+from rolldecayestimators.symbols import *
+from rolldecayestimators import equations, symbols
+from rolldecayestimators.substitute_dynamic_symbols import lambdify, lambdify_derivatives
+
+file_path = os.path.join(os.path.dirname(__file__), '_cubic_functions.py')
+
+## Damping and restoring for each model:
+models = {
+    'cubic':(
+        sp.Eq(B_44, B_1 * phi_dot + B_2 * phi_dot * sp.Abs(phi_dot) + B_3 * phi_dot ** 3),
+        sp.Eq(C_44, C_1 * phi + C_3 * phi ** 3 + C_5 * phi ** 5),
+    ),
+    'quadratic_b':(
+        sp.Eq(B_44, B_1 * phi_dot + B_2 * phi_dot * sp.Abs(phi_dot)),
+        sp.Eq(C_44, C_1 * phi),
+    ),
+    'quadratic_b_and_c':(
+        sp.Eq(B_44, B_1 * phi_dot + B_2 * phi_dot * sp.Abs(phi_dot)),
+        sp.Eq(C_44, C_1 * phi + C_3 * phi ** 3),
+    ),
+    'quadratic':(
+        sp.Eq(B_44, B_1 * phi_dot + B_2 * phi_dot * sp.Abs(phi_dot)),
+        sp.Eq(C_44, C_1 * phi + C_3 * phi ** 3 + C_5 * phi ** 5),
+    ),
+    'linear':(
+        sp.Eq(B_44, B_1 * phi_dot),
+        sp.Eq(C_44, C_1 * phi),
+    ),
+}
+
+# The general roll decay equation is solved for the acceleration once: phi2d = (-B_44 - C_44)/A_44
+acceleration_general = sp.solve(equations.roll_decay_equation_general_himeno, phi_dot_dot)[0]
+
+def roll_decay_acceleration(b44_equation, restoring_equation):
+    """
+    Roll acceleration from the roll decay equation with damping b44_equation and restoring restoring_equation,
+    normalized with A_44 (B_1A = B_1/A_44 etc.)
+    """
+    subs = [
+        (B_44, sp.solve(b44_equation, B_44)[0]),
+        (C_44, sp.solve(restoring_equation, C_44)[0])
+    ]
+    # Normalizing with A_44 (A_44 is cancelled by the expansion, so no simplify or solve is needed for each model):
+    return sp.expand(acceleration_general.subs(subs).subs(equations.subs_normalize))
+
+@lru_cache()
+def model_equations(model:str)->dict:
+    """
+    Sympy equations of a model in models, used as class attributes of the estimators in direct_estimator_cubic:
+    the damping and restoring, the roll decay equation (also normalized with A_44), the roll acceleration and the
+    equations for A_44 and omega0 (the same for all models)
+    """
+    b44_equation, restoring_equation = models[model]
+    subs = [
+        (B_44, sp.solve(b44_equation, B_44)[0]),
+        (C_44, sp.solve(restoring_equation, C_44)[0])
+    ]
+    roll_decay_equation = equations.roll_decay_equation_general_himeno.subs(subs)
+    lhs = sp.expand((roll_decay_equation.lhs / A_44).subs(equations.subs_normalize))
+    A44_equation = A44_expression()
+
+    return {
+        'b44_equation':b44_equation,
+        'restoring_equation':restoring_equation,
+        'roll_decay_equation':roll_decay_equation,
+        'roll_decay_equation_A':sp.Eq(lhs=lhs, rhs=0),
+        'acceleration':roll_decay_acceleration(b44_equation=b44_equation, restoring_equation=restoring_equation),
+        'A44_equation':A44_equation,
+        'omgea0_equation':sp.Eq(symbols.omega0, omega0_expression(A44_equation=A44_equation)),
+    }
+
+def A44_expression():
+    C_1_equation = equations.C_equation_linear.subs(symbols.C, symbols.C_1)  # C_1 = GM*gm
+
+    eqs = [
+        C_1_equation,
+        equations.normalize_equations[symbols.C_1]
+    ]
+
+    A44_equation = sp.Eq(symbols.A_44, sp.solve(eqs, symbols.C_1, symbols.A_44)[symbols.A_44])
+    return A44_equation
+
+def omega0_expression(A44_equation):
+    eqs = [equations.C_equation_linear,
+           equations.omega0_equation,
+           A44_equation,
+           ]
+    omgea0_equation = sp.Eq(symbols.omega0, sp.solve(eqs, symbols.A_44, symbols.C, symbols.omega0)[0][2])
+    return sp.solve(omgea0_equation,symbols.omega0)[0]
+
+def function_source(name, function):
+    """
+    Source code of a lambdified function, renamed to name
+    """
+    source = inspect.getsource(function)
+    return source.replace('def _lambdifygenerated(', 'def %s(' % name, 1)
+
+def build()->str:
+    """
+    Derive all functions and generate the source code of _cubic_functions.py
+    """
+    sources = []
+    for model, (b44_equation, restoring_equation) in models.items():
+        acceleration = roll_decay_acceleration(b44_equation=b44_equation, restoring_equation=restoring_equation)
+        sources.append(function_source('acceleration_%s' % model, lambdify(acceleration, cse=True)))
+        sources.append(function_source('jacobian_%s' % model,
+                                       lambdify_derivatives(acceleration, ['phi', 'phi1d'], cse=True)))
+        sources.append(function_source('gradient_%s' % model, lambdify_derivatives(acceleration, cse=True)))
+
+    A44_equation = A44_expression()
+    sources.append(function_source('A44', lambdify(sp.solve(A44_equation, symbols.A_44)[0])))
+    sources.append(function_source('omega0', lambdify(omega0_expression(A44_equation=A44_equation))))
+
+    header = ('"""\n'
+              'Lambdified functions for the estimators in direct_estimator_cubic.\n\n'
+              'This file is generated by build_cubic_functions.py, do not edit it by hand!\n'
+              '"""\n'
+              'from numpy import abs, sign, sqrt\n\n\n')
+
+    return header + '\n\n\n'.join(source.strip() for source in sources) + '\n'
+
+def main():
+    source = build()
+    with open(file_path, 'w') as file:
+        file.write(source)
+
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,7 @@ import matplotlib.pyplot as plt
 from rolldecayestimators import measure as measure
 from sklearn.metrics import r2_score
 
-from rolldecayestimators.substitute_dynamic_symbols import lambdify
+from rolldecayestimators.substitute_dynamic_symbols import lambdify, lambdify_derivatives, jit
 from rolldecayestimators.symbols import *
 from rolldecayestimators.estimator import RollDecay
 
@@ -46,7 +46,10 @@ class DirectEstimator(RollDecay):
     rhs = -phi_dot_dot / (omega0 ** 2) - 2 * zeta / omega0 * phi_dot - d * sp.Abs(phi_dot) * phi_dot / (omega0 ** 2)
     roll_diff_equation = sp.Eq(lhs=phi, rhs=rhs)
     acceleration = sp.Eq(lhs=phi, rhs=sp.solve(roll_diff_equation, phi.diff().diff())[0])
-    functions = {'acceleration':lambdify(acceleration.rhs)}
+    functions = {'acceleration':lambdify(acceleration.rhs, cse=True)}
+    functions['acceleration_jit'] = jit(functions['acceleration'])
+    functions['jacobian'] = lambdify_derivatives(acceleration.rhs, ['phi', 'phi1d'], cse=True)
+    functions['gradient'] = lambdify_derivatives(acceleration.rhs, cse=True)
 
     @classmethod
     def load(cls, omega0:float, d:float, zeta:float, X=None):
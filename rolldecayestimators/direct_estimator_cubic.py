@@ -4,11 +4,25 @@ from scipy.integrate import odeint
 from rolldecayestimators import DirectEstimator
 from rolldecayestimators.symbols import *
 from rolldecayestimators import equations, symbols
-from rolldecayestimators.substitute_dynamic_symbols import lambdify, run
+from rolldecayestimators.substitute_dynamic_symbols import run, jit
+from rolldecayestimators import _cubic_functions
 from sklearn.utils.validation import check_is_fitted
 from rolldecayestimators.estimator import RollDecay
 
 
+class ModelEquation:
+    """
+    Sympy equation of a model as a class attribute, derived by build_cubic_functions.py the first time it is used
+    (so that importing the estimators needs no sympy work)
+    """
+    def __init__(self, model:str, name:str):
+        self.model = model
+        self.name = name
+
+    def __get__(self, instance, owner):
+        from rolldecayestimators import build_cubic_functions
+        return build_cubic_functions.model_equations(self.model)[self.name]
+
 
 class EstimatorCubic(DirectEstimator):
     """ A template estimator to be used as a reference implementation.
@@ -22,42 +36,26 @@ class EstimatorCubic(DirectEstimator):
         A parameter used for demonstation of how to pass and store paramters.
     """
 
-    ## Cubic model:
-    b44_cubic_equation = sp.Eq(B_44, B_1 * phi_dot + B_2 * phi_dot * sp.Abs(phi_dot) + B_3 * phi_dot ** 3)
-    restoring_equation_cubic = sp.Eq(C_44, C_1 * phi + C_3 * phi ** 3 + C_5 * phi ** 5)
+    ## Cubic model (the equations are derived in build_cubic_functions.py):
+    b44_cubic_equation = ModelEquation('cubic', 'b44_equation')
+    restoring_equation_cubic = ModelEquation('cubic', 'restoring_equation')
+    roll_decay_equation = ModelEquation('cubic', 'roll_decay_equation')
+    roll_decay_equation_A = ModelEquation('cubic', 'roll_decay_equation_A')
+    acceleration = ModelEquation('cubic', 'acceleration')
+    A44_equation = ModelEquation('cubic', 'A44_equation')
+    omgea0_equation = ModelEquation('cubic', 'omgea0_equation')
 
-    subs = [
-        (B_44, sp.solve(b44_cubic_equation, B_44)[0]),
-        (C_44, sp.solve(restoring_equation_cubic, C_44)[0])
-    ]
-    roll_decay_equation = equations.roll_decay_equation_general_himeno.subs(subs)
-    # Normalizing with A_44:
-    lhs = (roll_decay_equation.lhs / A_44).subs(equations.subs_normalize).simplify()
-    roll_decay_equation_A = sp.Eq(lhs=lhs, rhs=0)
-
-    acceleration = sp.solve(roll_decay_equation_A, phi_dot_dot)[0]
     functions = {
-                'acceleration':lambdify(acceleration)
+                'acceleration':_cubic_functions.acceleration_cubic,
                 }
+    functions['acceleration_jit'] = jit(functions['acceleration'], cache=True)
+    functions['jacobian'] = _cubic_functions.jacobian_cubic
+    functions['gradient'] = _cubic_functions.gradient_cubic
+    functions['A44'] = _cubic_functions.A44
+    functions['omega0'] = _cubic_functions.omega0
 
-    C_1_equation = equations.C_equation_linear.subs(symbols.C, symbols.C_1)  # C_1 = GM*gm
-
-    eqs = [
-        C_1_equation,
-        equations.normalize_equations[symbols.C_1]
-    ]
-
-    A44_equation = sp.Eq(symbols.A_44, sp.solve(eqs, symbols.C_1, symbols.A_44)[symbols.A_44])
-    functions['A44'] = lambdify(sp.solve(A44_equation, symbols.A_44)[0])
-
-    eqs = [equations.C_equation_linear,
-           equations.omega0_equation,
-           A44_equation,
-           ]
-    omgea0_equation = sp.Eq(symbols.omega0, sp.solve(eqs, symbols.A_44, symbols.C, symbols.omega0)[0][2])
-    functions['omega0'] = lambdify(sp.solve(omgea0_equation,symbols.omega0)[0])
-
-    def __init__(self, maxfev=1000, bounds={}, ftol=10 ** -15, p0={}, fit_method='integration'):
+    def __init__(self, maxfev=1000, bounds={}, ftol=10 ** -15, p0={}, fit_method='integration', backend='solve_ivp',
+                 ode_method='RK45'):
 
         new_bounds={
             'B_1A':(0, np.inf),  # Assuming only positive coefficients
@@ -67,7 +65,8 @@ class EstimatorCubic(DirectEstimator):
         new_bounds.update(bounds)
         bounds=new_bounds
 
-        super().__init__(maxfev=maxfev, bounds=bounds, ftol=ftol, p0=p0, fit_method=fit_method, omega_regression=True)
+        super().__init__(maxfev=maxfev, bounds=bounds, ftol=ftol, p0=p0, fit_method=fit_method, omega_regression=True,
+                         backend=backend, ode_method=ode_method)
 
 
     @classmethod
@@ -167,22 +166,18 @@ class EstimatorQuadraticB(EstimatorCubic):
         A parameter used for demonstation of how to pass and store paramters.
     """
 
-    ## Cubic model:
-    b44_quadratic_equation = sp.Eq(B_44, B_1 * phi_dot + B_2 * phi_dot * sp.Abs(phi_dot))
-    restoring_equation_quadratic = sp.Eq(C_44, C_1 * phi)
+    ## Quadratic model (the equations are derived in build_cubic_functions.py):
+    b44_quadratic_equation = ModelEquation('quadratic_b', 'b44_equation')
+    restoring_equation_quadratic = ModelEquation('quadratic_b', 'restoring_equation')
+    roll_decay_equation = ModelEquation('quadratic_b', 'roll_decay_equation')
+    roll_decay_equation_A = ModelEquation('quadratic_b', 'roll_decay_equation_A')
+    acceleration = ModelEquation('quadratic_b', 'acceleration')
 
-    subs = [
-        (B_44, sp.solve(b44_quadratic_equation, B_44)[0]),
-        (C_44, sp.solve(restoring_equation_quadratic, C_44)[0])
-    ]
-    roll_decay_equation = equations.roll_decay_equation_general_himeno.subs(subs)
-    # Normalizing with A_44:
-    lhs = (roll_decay_equation.lhs / A_44).subs(equations.subs_normalize).simplify()
-    roll_decay_equation_A = sp.Eq(lhs=lhs, rhs=0)
-
-    acceleration = sp.solve(roll_decay_equation_A, phi_dot_dot)[0]
     functions = dict(EstimatorCubic.functions)
-    functions['acceleration'] = lambdify(acceleration)
+    functions['acceleration'] = _cubic_functions.acceleration_quadratic_b
+    functions['acceleration_jit'] = jit(functions['acceleration'], cache=True)
+    functions['jacobian'] = _cubic_functions.jacobian_quadratic_b
+    functions['gradient'] = _cubic_functions.gradient_quadratic_b
 
     @classmethod
     def load(cls, B_1A:float, B_2A:float, C_1A:float, X=None, **kwargs):
@@ -228,22 +223,18 @@ class EstimatorQuadraticBandC(EstimatorCubic):
         A parameter used for demonstation of how to pass and store paramters.
     """
 
-    ## Quadratic model:
-    b44_quadratic_equation = sp.Eq(B_44, B_1 * phi_dot + B_2 * phi_dot * sp.Abs(phi_dot))
-    restoring_equation_quadratic = sp.Eq(C_44, C_1 * phi + C_3 * phi ** 3)
-
-    subs = [
-        (B_44, sp.solve(b44_quadratic_equation, B_44)[0]),
-        (C_44, sp.solve(restoring_equation_quadratic, C_44)[0])
-    ]
-    roll_decay_equation = equations.roll_decay_equation_general_himeno.subs(subs)
-    # Normalizing with A_44:
-    lhs = (roll_decay_equation.lhs / A_44).subs(equations.subs_normalize).simplify()
-    roll_decay_equation_A = sp.Eq(lhs=lhs, rhs=0)
+    ## Quadratic model (the equations are derived in build_cubic_functions.py):
+    b44_quadratic_equation = ModelEquation('quadratic_b_and_c', 'b44_equation')
+    restoring_equation_quadratic = ModelEquation('quadratic_b_and_c', 'restoring_equation')
+    roll_decay_equation = ModelEquation('quadratic_b_and_c', 'roll_decay_equation')
+    roll_decay_equation_A = ModelEquation('quadratic_b_and_c', 'roll_decay_equation_A')
+    acceleration = ModelEquation('quadratic_b_and_c', 'acceleration')
 
-    acceleration = sp.solve(roll_decay_equation_A, phi_dot_dot)[0]
     functions = dict(EstimatorCubic.functions)
-    functions['acceleration'] = lambdify(acceleration)
+    functions['acceleration'] = _cubic_functions.acceleration_quadratic_b_and_c
+    functions['acceleration_jit'] = jit(functions['acceleration'], cache=True)
+    functions['jacobian'] = _cubic_functions.jacobian_quadratic_b_and_c
+    functions['gradient'] = _cubic_functions.gradient_quadratic_b_and_c
 
 class EstimatorQuadratic(EstimatorCubic):
     """ A template estimator to be used as a reference implementation.
@@ -257,22 +248,18 @@ class EstimatorQuadratic(EstimatorCubic):
         A parameter used for demonstation of how to pass and store paramters.
     """
 
-    ## Quadratic model with Cubic restoring force:
-    b44_quadratic_equation = sp.Eq(B_44, B_1 * phi_dot + B_2 * phi_dot * sp.Abs(phi_dot))
-    restoring_equation_cubic = sp.Eq(C_44, C_1 * phi + C_3 * phi ** 3 + C_5 * phi ** 5)
+    ## Quadratic model with Cubic restoring force (the equations are derived in build_cubic_functions.py):
+    b44_quadratic_equation = ModelEquation('quadratic', 'b44_equation')
+    restoring_equation_cubic = ModelEquation('quadratic', 'restoring_equation')
+    roll_decay_equation = ModelEquation('quadratic', 'roll_decay_equation')
+    roll_decay_equation_A = ModelEquation('quadratic', 'roll_decay_equation_A')
+    acceleration = ModelEquation('quadratic', 'acceleration')
 
-    subs = [
-        (B_44, sp.solve(b44_quadratic_equation, B_44)[0]),
-        (C_44, sp.solve(restoring_equation_cubic, C_44)[0])
-    ]
-    roll_decay_equation = equations.roll_decay_equation_general_himeno.subs(subs)
-    # Normalizing with A_44:
-    lhs = (roll_decay_equation.lhs / A_44).subs(equations.subs_normalize).simplify()
-    roll_decay_equation_A = sp.Eq(lhs=lhs, rhs=0)
-
-    acceleration = sp.solve(roll_decay_equation_A, phi_dot_dot)[0]
     functions = dict(EstimatorCubic.functions)
-    functions['acceleration'] = lambdify(acceleration)
+    functions['acceleration'] = _cubic_functions.acceleration_quadratic
+    functions['acceleration_jit'] = jit(functions['acceleration'], cache=True)
+    functions['jacobian'] = _cubic_functions.jacobian_quadratic
+    functions['gradient'] = _cubic_functions.gradient_quadratic
 
 class EstimatorLinear(EstimatorCubic):
     """ A template estimator to be used as a reference implementation.
@@ -286,23 +273,18 @@ class EstimatorLinear(EstimatorCubic):
         A parameter used for demonstation of how to pass and store paramters.
     """
 
-    ## Linear model:
-    b44_linear_equation = sp.Eq(B_44, B_1 * phi_dot)
-    restoring_linear_quadratic = sp.Eq(C_44, C_1 * phi)
-
-
-    subs = [
-        (B_44, sp.solve(b44_linear_equation, B_44)[0]),
-        (C_44, sp.solve(restoring_linear_quadratic, C_44)[0])
-    ]
-    roll_decay_equation = equations.roll_decay_equation_general_himeno.subs(subs)
-    # Normalizing with A_44:
-    lhs = (roll_decay_equation.lhs / A_44).subs(equations.subs_normalize).simplify()
-    roll_decay_equation_A = sp.Eq(lhs=lhs, rhs=0)
+    ## Linear model (the equations are derived in build_cubic_functions.py):
+    b44_linear_equation = ModelEquation('linear', 'b44_equation')
+    restoring_linear_quadratic = ModelEquation('linear', 'restoring_equation')
+    roll_decay_equation = ModelEquation('linear', 'roll_decay_equation')
+    roll_decay_equation_A = ModelEquation('linear', 'roll_decay_equation_A')
+    acceleration = ModelEquation('linear', 'acceleration')
 
-    acceleration = sp.solve(roll_decay_equation_A, phi_dot_dot)[0]
     functions = dict(EstimatorCubic.functions)
-    functions['acceleration'] = lambdify(acceleration)
+    functions['acceleration'] = _cubic_functions.acceleration_linear
+    functions['acceleration_jit'] = jit(functions['acceleration'], cache=True)
+    functions['jacobian'] = _cubic_functions.jacobian_linear
+    functions['gradient'] = _cubic_functions.gradient_linear
 
     @classmethod
     def load(cls, B_1A:float, C_1A:float, X=None, **kwargs):
@@ -4,7 +4,7 @@ This is a module to be used as a reference for building other modules
 import numpy as np
 import pandas as pd
 from scipy.integrate import odeint
-from rolldecayestimators.substitute_dynamic_symbols import lambdify
+from rolldecayestimators.substitute_dynamic_symbols import lambdify, lambdify_derivatives, jit
 from rolldecayestimators.symbols import *
 import inspect
 from scipy.optimize import curve_fit
@@ -33,7 +33,10 @@ class DirectLinearEstimator(DirectEstimator):
     rhs = -phi_dot_dot/(omega0**2) - 2*zeta/omega0*phi_dot
     roll_diff_equation = sp.Eq(lhs=phi, rhs=rhs)
     acceleration = sp.Eq(lhs=phi, rhs=sp.solve(roll_diff_equation, phi.diff().diff())[0])
-    functions = {'acceleration':lambdify(acceleration.rhs)}
+    functions = {'acceleration':lambdify(acceleration.rhs, cse=True)}
+    functions['acceleration_jit'] = jit(functions['acceleration'])
+    functions['jacobian'] = lambdify_derivatives(acceleration.rhs, ['phi', 'phi1d'], cse=True)
+    functions['gradient'] = lambdify_derivatives(acceleration.rhs, cse=True)
 
     @classmethod
     def load(cls, omega0:float, zeta:float, X=None):
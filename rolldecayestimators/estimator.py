@@ -1,20 +1,54 @@
 import inspect
+import copy
 from scipy.optimize import least_squares
 from scipy.integrate import odeint
 from scipy.integrate import solve_ivp
+from scipy.optimize import OptimizeResult
 from sklearn.base import BaseEstimator
 from sklearn.utils.validation import check_is_fitted
 from sklearn.metrics import r2_score
+from joblib import Parallel, delayed
 
 import numpy as np
 import pandas as pd
+from functools import lru_cache
 
-from rolldecayestimators.substitute_dynamic_symbols import lambdify
+from rolldecayestimators.substitute_dynamic_symbols import lambdify, lambdify_derivatives, jit
 from rolldecayestimators.symbols import *
 from rolldecayestimators.measure import fft, fft_omega0
+from rolldecayestimators import integrators
+
+try:
+    from scikits.odes import ode as sundials_ode
+except ImportError:  # scikits.odes (SUNDIALS) is optional, it is only needed for backend='cvode'
+    sundials_ode = None
 
 class FitError(Exception):pass
 
+IMPLICIT_METHODS = ['LSODA', 'BDF', 'Radau']  # solve_ivp methods that use a jacobian
+
+@lru_cache()
+def argument_names(function)->tuple:
+    """
+    Names of the arguments of a (lambdified) function, in order.
+    """
+    return tuple(inspect.signature(function).parameters.keys())
+
+@lru_cache()
+def free_parameter_names(function, remove:tuple)->tuple:
+    """
+    Names of the arguments of a (lambdified) function except the ones in remove, in order.
+    """
+    return tuple(name for name in argument_names(function) if not name in remove)
+
+def _fit_copy(estimator, X):
+    """
+    Fit a copy of the estimator to X (used by fit_many in the worker processes)
+    """
+    estimator = copy.deepcopy(estimator)
+    estimator.fit(X=X)
+    return estimator
+
 class RollDecay(BaseEstimator):
 
     # Defining the diff equation for this estimator:
@@ -22,10 +56,14 @@ class RollDecay(BaseEstimator):
     roll_diff_equation = sp.Eq(lhs=phi, rhs=rhs)
     acceleration = sp.Eq(lhs=phi, rhs=sp.solve(roll_diff_equation, phi.diff().diff())[0])
     functions = {
-        'acceleration':lambdify(acceleration.rhs)
+        'acceleration':lambdify(acceleration.rhs, cse=True)
     }
+    functions['acceleration_jit'] = jit(functions['acceleration'])
+    functions['jacobian'] = lambdify_derivatives(acceleration.rhs, ['phi', 'phi1d'], cse=True)
+    functions['gradient'] = lambdify_derivatives(acceleration.rhs, cse=True)
 
-    def __init__(self, ftol=1e-09, maxfev=100000, bounds={}, p0={}, fit_method='derivation', omega_regression=True, omega0=None):
+    def __init__(self, ftol=1e-09, maxfev=100000, bounds={}, p0={}, fit_method='derivation', omega_regression=True, omega0=None,
+                 backend='solve_ivp', ode_method='RK45'):
         self.is_fitted_ = False
 
         self.phi_key = 'phi'  # Roll angle [rad]
@@ -40,6 +78,8 @@ class RollDecay(BaseEstimator):
         self.omega_regression = omega_regression
         self.assert_success = True
         self._omega0 = omega0
+        self.backend = backend  # ODE integration with: 'solve_ivp', 'odeint', 'numba' (see integrators.py) or 'cvode'
+        self.ode_method = ode_method  # solve_ivp method, the implicit methods ('LSODA','BDF','Radau') use the jacobian
 
     @classmethod
     def load(cls,data:{}, X=None):
@@ -115,43 +155,70 @@ class RollDecay(BaseEstimator):
     def calculate_acceleration(self):
         return self.functions['acceleration']
 
+    @property
+    def calculate_acceleration_jit(self):
+        """
+        Compiled version of calculate_acceleration (for scalars), used by the compiled integrator (backend='numba').
+        """
+        return self.functions.get('acceleration_jit', self.calculate_acceleration)
+
     @property
     def parameter_names(self):
-        signature = inspect.signature(self.calculate_acceleration)
 
-        remove = [self.phi_key, self.phi1d_key]
-        if not self.omega_regression:
-            remove.append('omega0')
+        if self.omega_regression:
+            remove = (self.phi_key, self.phi1d_key)
+        else:
+            remove = (self.phi_key, self.phi1d_key, 'omega0')
 
-        return list(set(signature.parameters.keys()) - set(remove))
+        return free_parameter_names(self.calculate_acceleration, remove)
 
     @staticmethod
-    def error(x, self, xs, ys):
-        #return np.sum((ys - self.estimator(x, xs))**2)
-        return ys-self.estimator(x, xs)
+    def error(x, self):
+        return self._y - self.estimator(x)
 
 
-    def estimator(self, x, xs):
-        self.parameters = {key: x for key, x in zip(self.parameter_names, x)}
+    @staticmethod
+    def error_jacobian(x, self):
+        """
+        Analytic jacobian of error in derivation mode: -d(acceleration)/d(parameters), shape (len(X), len(x))
+        """
+        parameters = {key: x for key, x in zip(self.parameter_names, x)}
 
         if not self.omega_regression:
-            self.parameters['omega0'] = self.omega0
+            parameters['omega0'] = self.omega0
+
+        parameters['phi'] = self._phi
+        parameters['phi1d'] = self._phi1d
+        calculate_gradient = self.functions['gradient']
+        gradient = calculate_gradient(**parameters)
+        names = argument_names(calculate_gradient)
+
+        jacobian = np.empty((len(self._y), len(x)))
+        for i, key in enumerate(self.parameter_names):
+            jacobian[:, i] = -gradient[names.index(key)]
+
+        return jacobian
+
+    def estimator(self, x):
 
         if self.fit_method=='derivation':
-            self.parameters['phi'] = xs[self.phi_key]
-            self.parameters['phi1d'] = xs[self.phi1d_key]
-            return self.estimator_acceleration(parameters=self.parameters)
-        elif self.fit_method=='integration':
-            t = xs.index
-            
-            phi0=xs.iloc[0][self.phi_key]
+            self.parameters = {key: x for key, x in zip(self.parameter_names, x)}
 
-            try:
-                phi1d0 = xs.iloc[0][self.phi1d_key]
-            except:
-                phi1d0 = 0
+            if not self.omega_regression:
+                self.parameters['omega0'] = self.omega0
 
-            return self.estimator_integration(t=t, phi0=phi0, phi1d0=phi1d0)
+            self.parameters['phi'] = self._phi
+            self.parameters['phi1d'] = self._phi1d
+            return self.estimator_acceleration(parameters=self.parameters)
+        elif self.fit_method=='integration':
+            # The parameters are passed on positionally to the simulation (no parameters dict):
+            parameter_names = self.parameter_names
+            if not self.omega_regression:
+                parameter_names += ('omega0',)
+                x = np.append(x, self.omega0)
+
+            return self.estimator_integration(t=self._t, phi0=self._phi0, phi1d0=self._phi1d0,
+                                              parameter_names=parameter_names, x=x)
         else:
             raise ValueError('Unknown fit_mehod:%s' % self.fit_method)
 
@@ -159,30 +226,42 @@ class RollDecay(BaseEstimator):
         acceleration = self.calculate_acceleration(**parameters)
         return acceleration
 
-    def estimator_integration(self, t, phi0, phi1d0):
+    def estimator_integration(self, t, phi0, phi1d0, parameter_names:tuple, x):
+
+        # The parameter names are checked before the simulation, so that a wrong name is raised as an error instead
+        # of being caught below as a failed simulation:
+        missing = [name for name in free_parameter_names(self.calculate_acceleration, (self.phi_key, self.phi1d_key))
+                   if not name in parameter_names]
+        if missing:
+            raise ValueError('Missing parameters:%s' % missing)
 
         try:
-            df = self.simulate(t=t, phi0=phi0, phi1d0=phi1d0)
-        except:
-            df = pd.DataFrame(index=t)
-            df['phi']=np.inf
-            df['phi1d']=np.inf
+            states = self._simulate_positional(t=t, phi0=phi0, phi1d0=phi1d0, parameter_names=parameter_names, x=x)
+        except (ValueError, RuntimeError):  # The simulation failed with these parameters
+            return np.full(len(t), np.inf, dtype=np.float64)
 
-        return df[self.y_key]
+        return states[0, :]  # phi
 
     def fit(self, X, y=None, **kwargs):
         self.X = X.copy()
 
-        kwargs = {'self': self,
-                  'xs': X,
-                  'ys': X[self.y_key]}
+        # The measurement as raw arrays, so that least_squares iterations don't need any pandas indexing:
+        self._t = X.index.to_numpy()
+        self._phi = X[self.phi_key].to_numpy()
+        self._phi1d = X[self.phi1d_key].to_numpy() if self.phi1d_key in X else None
+        self._y = X[self.y_key].to_numpy()
+        self._phi0 = float(self._phi[0])
+        self._phi1d0 = float(self._phi1d[0]) if self.phi1d_key in X else 0.0
+
+        kwargs = {'self': self}
 
 
         if self.fit_method=='integration':
             self.result = least_squares(fun=self.error, x0=self.initial_guess, kwargs=kwargs, bounds=self.bounds,
                                     ftol=self.ftol, max_nfev=self.maxfev, loss='soft_l1', f_scale=0.1)
         else:
-            self.result = least_squares(fun=self.error, x0=self.initial_guess, kwargs=kwargs,
+            jac = self.error_jacobian if 'gradient' in self.functions else '2-point'
+            self.result = least_squares(fun=self.error, x0=self.initial_guess, kwargs=kwargs, jac=jac,
                                     ftol=self.ftol, max_nfev=self.maxfev, method='lm')
 
         if self.assert_success:
@@ -196,8 +275,60 @@ class RollDecay(BaseEstimator):
 
         self.is_fitted_ = True
 
+    def fit_many(self, Xs:list, n_jobs=-1)->list:
+        """
+        Fit one estimator to each roll decay test in Xs, where the independent fits are run in parallel processes
+        (joblib).
+
+        Parameters
+        ----------
+        Xs : list
+            List with DataFrames, one for each roll decay test.
+        n_jobs : int
+            number of processes (-1: one per cpu core)
+
+        Returns
+        -------
+        estimators
+            list with fitted copies of this estimator, one for each test in Xs.
+        """
+        return Parallel(n_jobs=n_jobs)(delayed(_fit_copy)(self, X) for X in Xs)
+
     def simulate(self, t, phi0, phi1d0)->pd.DataFrame:
 
+        states = self._simulate_array(t=t, phi0=phi0, phi1d0=phi1d0)
+
+        phi2d = self.calculate_acceleration(phi1d=states[1, :], phi=states[0, :], **self.parameters)
+        df = pd.DataFrame(data={
+            self.phi_key:states[0, :],
+            self.phi1d_key:states[1, :],
+            self.phi2d_key:phi2d,
+        }, index=t)
+
+        return df
+
+    def _simulate_array(self, t, phi0, phi1d0)->np.ndarray:
+        """
+        Simulate with the current parameters, without building a DataFrame (used in each iteration of the fit)
+
+        Returns
+        -------
+        states : ndarray
+            shape (2, len(t)) with phi and phi1d
+        """
+        return self._simulate_positional(t=t, phi0=phi0, phi1d0=phi1d0, parameter_names=tuple(self.parameters.keys()),
+                                         x=list(self.parameters.values()))
+
+    def _simulate_positional(self, t, phi0, phi1d0, parameter_names:tuple, x)->np.ndarray:
+        """
+        Simulate with the parameter values x, in the order of parameter_names
+
+        Returns
+        -------
+        states : ndarray
+            shape (2, len(t)) with phi and phi1d
+        """
+
         states0 = [phi0, phi1d0]
 
         #states = odeint(self.roll_decay_time_step, y0=states0, t=t, args=(self,parameters))
@@ -206,34 +337,204 @@ class RollDecay(BaseEstimator):
 
         t_ = t-t[0]
         t_span = [t_[0], t_[-1]]
-        self.simulation_result = solve_ivp(fun=self.roll_decay_time_step, t_span=t_span, y0=states0, t_eval=t_,
-                                           )
+        if self.backend == 'solve_ivp':
+            time_step = self._time_step_function(parameter_names=parameter_names, x=x)
+            kwargs = {}
+            if self.ode_method in IMPLICIT_METHODS and 'jacobian' in self.functions:
+                kwargs['jac'] = self.jacobian_function(parameters=dict(zip(parameter_names, x)))
+            self.simulation_result = solve_ivp(fun=time_step, t_span=t_span, y0=states0, t_eval=t_,
+                                               method=self.ode_method, **kwargs)
+        elif self.backend == 'odeint':
+            self.simulation_result = self.simulate_odeint(t=t_, states0=states0, parameter_names=parameter_names, x=x)
+        elif self.backend == 'numba':
+            self.simulation_result = self.simulate_numba(t=t_, states0=states0, parameter_names=parameter_names, x=x)
+        elif self.backend == 'cvode':
+            self.simulation_result = self.simulate_cvode(t=t_, states0=states0, parameter_names=parameter_names, x=x)
+        else:
+            raise ValueError('Unknown backend:%s' % self.backend)
+
         if not self.simulation_result['success']:
             raise ValueError('Simulation failed')
 
-        df = pd.DataFrame(index=t)
-        df[self.phi_key] = self.simulation_result.y[0, :]
-        df[self.phi1d_key] = self.simulation_result.y[1, :]
-        p_old = df[self.phi1d_key]
-        phi_old = df[self.phi_key]
-        df[self.phi2d_key] = self.calculate_acceleration(phi1d=p_old, phi=phi_old, **self.parameters)
+        return self.simulation_result.y
 
-        return df
+    def simulate_odeint(self, t, states0, parameter_names:tuple, x)->OptimizeResult:
+        """
+        Integrate the roll decay equation with odeint (LSODA in Fortran), where the stepping is done in compiled code
+        and only the right hand side (and the analytic jacobian when the problem is stiff) are called in Python.
+        This is faster and more accurate than solve_ivp for simulations, but LSODA switches method and order so that the
+        result is not smooth in the parameters, which spoils the finite difference jacobian in integration fits
+        (use 'solve_ivp' or 'numba' for these).
 
-    def roll_decay_time_step(self,t,states):
+        Parameters
+        ----------
+        t : array
+            time vector starting at 0 [s]
+        states0 : list
+            initial states [phi, phi1d]
+        parameter_names : tuple
+            names of the parameters in x
+        x : array
+            parameter values
+
+        Returns
+        -------
+        result
+            with states y (like the result from solve_ivp)
+        """
+        time_step = self._time_step_function(parameter_names=parameter_names, x=x)
+        kwargs = {}
+        if 'jacobian' in self.functions:
+            kwargs['Dfun'] = self.jacobian_function(parameters=dict(zip(parameter_names, x)))
+
+        states, info = odeint(func=time_step, y0=states0, t=t, tfirst=True, full_output=True, **kwargs)
+        success = info['message'] == 'Integration successful.'
+        return OptimizeResult(t=t, y=states.T, success=success, message=info['message'])
+
+    def simulate_numba(self, t, states0, parameter_names:tuple, x)->OptimizeResult:
+        """
+        Integrate the roll decay equation with the compiled integrator in integrators.py
+
+        Parameters
+        ----------
+        t : array
+            time vector starting at 0 [s]
+        states0 : list
+            initial states [phi, phi1d]
+        parameter_names : tuple
+            names of the parameters in x
+        x : array
+            parameter values
+
+        Returns
+        -------
+        result
+            with states y (like the result from solve_ivp)
+        """
+        acceleration = integrators.positional_acceleration(acceleration=self.calculate_acceleration_jit,
+                                                           parameter_names=parameter_names)
+        parameters = np.asarray(x, dtype=float)
+        y, success = integrators.dopri5(acceleration, np.asarray(t, dtype=float), np.asarray(states0, dtype=float),
+                                        parameters)
+        return OptimizeResult(t=t, y=y, success=success)
+
+    def simulate_cvode(self, t, states0, parameter_names:tuple, x)->OptimizeResult:
+        """
+        Integrate the roll decay equation with CVODE (BDF with the analytic jacobian) from SUNDIALS,
+        this requires the optional package scikits.odes.
+
+        Parameters
+        ----------
+        t : array
+            time vector starting at 0 [s]
+        states0 : list
+            initial states [phi, phi1d]
+        parameter_names : tuple
+            names of the parameters in x
+        x : array
+            parameter values
+
+        Returns
+        -------
+        result
+            with states y (like the result from solve_ivp)
+        """
+        if sundials_ode is None:
+            raise ImportError("backend='cvode' requires scikits.odes (with SUNDIALS)")
+
+        time_step = self._time_step_function(parameter_names=parameter_names, x=x)
+
+        def rhs(t, states, states1d):
+            states1d[0], states1d[1] = time_step(t, states)
+
+        options = {}
+        if 'jacobian' in self.functions:
+            jacobian = self.jacobian_function(parameters=dict(zip(parameter_names, x)))
+
+            def jacfn(t, states, states1d, J):
+                J[:, :] = jacobian(t, states)
+                return 0
+
+            options['jacfn'] = jacfn
+
+        solver = sundials_ode('cvode', rhs, **options)
+        output = solver.solve(np.asarray(t, dtype=float), np.asarray(states0, dtype=float))
+        success = (output.flag >= 0) and (len(output.values.t) == len(t))
+        y = np.transpose(output.values.y) if success else None
+        return OptimizeResult(t=t, y=y, success=success, message=output.message)
+
+    def time_step_function(self, parameters:dict):
+        """
+        Right hand side of the roll decay equation: time_step(t, states) --> (phi1d, phi2d),
+        generated for these parameters, with the parameter values written as constants in the source code, so that
+        the acceleration is called with positional arguments at each time step (no dict/kwargs handling).
+
+        Parameters
+        ----------
+        parameters : dict
+            parameters of the acceleration
+
+        Returns
+        -------
+        time_step
+            function for the ODE solver
+        """
+        return self._time_step_function(parameter_names=tuple(parameters.keys()), x=list(parameters.values()))
+
+    def _time_step_function(self, parameter_names:tuple, x):
+        """
+        Same as time_step_function, with the parameter values x in the order of parameter_names
+        """
         # states:
         # [phi,phi1d]
 
-        phi_old = states[0]
-        p_old = states[1]
+        states = {
+            'phi':'states[0]',
+            'phi1d':'states[1]',
+        }
+        arguments = []
+        for name in argument_names(self.calculate_acceleration):
+            if name in states:
+                arguments.append(states[name])
+            else:
+                arguments.append(repr(float(x[parameter_names.index(name)])))
+
+        source = 'def time_step(t, states):\n'
+        source += '    return states[1], calculate_acceleration(%s)\n' % ', '.join(arguments)
+        namespace = {'calculate_acceleration': self.calculate_acceleration, 'inf': np.inf, 'nan': np.nan}
+        exec(source, namespace)
+
+        return namespace['time_step']  # (a tuple is converted to an array by solve_ivp)
+
+    def jacobian_function(self, parameters:dict):
+        """
+        Analytic jacobian of the right hand side: jacobian(t, states) --> [[0, 1], [dphi2d/dphi, dphi2d/dphi1d]],
+        with the parameters bound to the function once.
+        This is used by the implicit methods in solve_ivp instead of a finite difference approximation.
 
-        phi1d = p_old
-        calculate_acceleration = self.calculate_acceleration
-        phi2d = calculate_acceleration(phi1d=p_old, phi=phi_old, **self.parameters)
+        Parameters
+        ----------
+        parameters : dict
+            parameters of the acceleration
 
-        d_states_dt = np.array([phi1d, phi2d])
+        Returns
+        -------
+        jacobian
+            function for the ODE solver
+        """
+        calculate_jacobian = self.functions['jacobian']
+        names = argument_names(calculate_jacobian)
+        arguments = [parameters.get(name) for name in names]
+        i_phi = names.index('phi')
+        i_phi1d = names.index('phi1d')
+
+        def jacobian(t, states):
+            arguments[i_phi] = states[0]
+            arguments[i_phi1d] = states[1]
+            dphi, dphi1d = calculate_jacobian(*arguments)
+            return np.array([[0.0, 1.0], [dphi, dphi1d]])
 
-        return d_states_dt
+        return jacobian
 
     def predict(self, X)->pd.DataFrame:
 
@@ -244,6 +545,23 @@ class RollDecay(BaseEstimator):
         t = np.array(X.index)
         return self.simulate(t=t, phi0=phi0, phi1d0=phi1d0)
 
+    def _predict_phi(self, X)->np.ndarray:
+        """
+        Predicted roll angle as an array (without building the DataFrame in predict)
+        """
+        check_is_fitted(self, 'is_fitted_')
+
+        phi0 = X[self.phi_key].iloc[0]
+        phi1d0 = X[self.phi1d_key].iloc[0]
+        t = np.array(X.index)
+        return self._simulate_phi(t=t, phi0=phi0, phi1d0=phi1d0)
+
+    def _simulate_phi(self, t, phi0, phi1d0)->np.ndarray:
+        """
+        Simulated roll angle with the current parameters (used by _predict_phi)
+        """
+        return self._simulate_array(t=t, phi0=phi0, phi1d0=phi1d0)[0, :]
+
 
     def score(self, X=None, y=None, sample_weight=None):
         """
@@ -283,8 +601,7 @@ class RollDecay(BaseEstimator):
             X=self.X
 
         y_true = X[self.phi_key]
-        df_sim = self.predict(X)
-        y_pred = df_sim[self.phi_key]
+        y_pred = pd.Series(self._predict_phi(X), index=X.index, name=self.phi_key)
         return y_true, y_pred
 
     @property
@@ -322,10 +639,13 @@ class RollDecay(BaseEstimator):
         if not self._omega0 is None:
             return self._omega0
 
-        frequencies, dft = fft(self.X['phi'])
-        omega0 = fft_omega0(frequencies=frequencies, dft=dft)
+        # The fft is only calculated once for each measurement X (fit sets a new X):
+        if getattr(self, '_omega0_X', None) is not self.X:
+            frequencies, dft = fft(self.X['phi'])
+            self._omega0_fft = fft_omega0(frequencies=frequencies, dft=dft)
+            self._omega0_X = self.X
 
-        return omega0
+        return self._omega0_fft
 
 
     def result_for_database(self, meta_data={}, score=True):
@@ -337,8 +657,8 @@ class RollDecay(BaseEstimator):
             s['score'] = self.score(X=self.X)
 
         if not self.X is None:
-            s['phi_start'] = self.X.iloc[0]['phi']
-            s['phi_stop'] = self.X.iloc[-1]['phi']
+            s['phi_start'] = self.X['phi'].iloc[0]
+            s['phi_stop'] = self.X['phi'].iloc[-1]
 
         if hasattr(self,'omega0'):
             s['omega0_fft'] = self.omega0
@@ -0,0 +1,161 @@
+"""
+Compiled lowpass filtering and derivation of the roll signal.
+
+The zero phase (forward-backward) filtering with second order sections and the central differences for roll velocity
+and acceleration are compiled together with numba, so that LowpassFilterDerivatorTransformer gets all three signals
+from one call without calls back to Python. Apart from the result, only the extended signal and the forward filtered
+signal (each padlen samples longer than the signal at both ends) are allocated in each call. The filtering follows
+scipy.signal.sosfiltfilt (odd extension at the ends and steady state initial conditions), so the results are the same.
+"""
+import numpy as np
+
+from rolldecayestimators._numba import njit, prange, NUMBA
+
+
+@njit(cache=True)
+def _sosfilt(sos, x, zi, y, backward):
+    """
+    Filter x with the second order sections sos (transposed direct form II) into y, forward or backward in time. The
+    initial states of the sections are zi times the first sample.
+
+    All sections are applied to one sample before the next (rather than one section at a time over the whole signal),
+    which keeps the signal in one pass through memory and lets the sections overlap in the cpu pipeline. This was
+    measured faster than a section by section loop with the states as scalars.
+    """
+    n = len(x)
+    x0 = x[n - 1] if backward else x[0]
+
+    n_sections = sos.shape[0]
+    z = np.empty((n_sections, 2))
+    for s in range(n_sections):
+        z[s, 0] = zi[s, 0] * x0
+        z[s, 1] = zi[s, 1] * x0
+
+    for k in range(n):
+        i = n - 1 - k if backward else k
+        x_ = x[i]
+        for s in range(n_sections):
+            y_ = sos[s, 0] * x_ + z[s, 0]
+            z[s, 0] = sos[s, 1] * x_ - sos[s, 4] * y_ + z[s, 1]
+            z[s, 1] = sos[s, 2] * x_ - sos[s, 5] * y_
+            x_ = y_
+        y[i] = x_
+
+
+@njit(cache=True)
+def _derivatives(y, dt, dydt, d2ydt2):
+    """
+    First and second derivative of y with time step dt into dydt and d2ydt2, in one pass (same as
+    np.gradient(y, dt) and np.gradient(np.gradient(y, dt), dt)). The first derivatives needed for the second
+    derivative are kept as (float64) scalars, so dydt and d2ydt2 can have lower precision than y.
+    """
+    n = len(y)
+    factor = 1 / (2 * dt)
+    d_previous = (y[1] - y[0]) / dt
+    d_current = (y[2] - y[0]) * factor
+    dydt[0] = d_previous
+    dydt[1] = d_current
+    d2ydt2[0] = (d_current - d_previous) / dt
+    for i in range(1, n - 2):
+        d_next = (y[i + 2] - y[i]) * factor
+        dydt[i + 1] = d_next
+        d2ydt2[i] = (d_next - d_previous) * factor
+        d_previous = d_current
+        d_current = d_next
+    d_last = (y[n - 1] - y[n - 2]) / dt
+    dydt[n - 1] = d_last
+    d2ydt2[n - 2] = (d_last - d_previous) * factor
+    d2ydt2[n - 1] = (d_last - d_current) / dt
+
+
+@njit(cache=True)
+def filter_and_derive(x, sos, zi, padlen, dt, out):
+    """
+    Zero phase lowpass filter the roll signal and calculate the roll velocity and acceleration.
+
+    Parameters
+    ----------
+    x : array
+        roll angle [rad]
+    sos : ndarray
+        second order sections of the filter, shape (n_sections, 6)
+    zi : ndarray
+        steady state initial conditions of the sections (scipy.signal.sosfilt_zi), shape (n_sections, 2)
+    padlen : int
+        length of the odd extension at each end (must be less than len(x))
+    dt : float
+        time step [s]
+    out : ndarray
+        shape (3, len(x)) where the filtered roll angle and its first and second time derivatives are stored. The
+        filtering and derivation is always done in float64, so out can be float32 to halve the memory of the result.
+    """
+    n = len(x)
+    n_ext = n + 2 * padlen
+
+    # Odd extension at both ends:
+    ext = np.empty(n_ext)
+    for i in range(padlen):
+        ext[i] = 2 * x[0] - x[padlen - i]
+        ext[padlen + n + i] = 2 * x[n - 1] - x[n - 2 - i]
+    for i in range(n):
+        ext[padlen + i] = x[i]
+
+    # Forward and backward (in place of the extended signal, so that it does not have to be reversed):
+    forward = np.empty(n_ext)
+    _sosfilt(sos, ext, zi, forward, False)
+    _sosfilt(sos, forward, zi, ext, True)
+    phi_filtered = ext[padlen:padlen + n]
+
+    for i in range(n):
+        out[0, i] = phi_filtered[i]
+    _derivatives(phi_filtered, dt, out[1], out[2])
+
+
+@njit(parallel=True, cache=True)
+def filter_and_derive_batch(x, lengths, sos, zi, padlen, dt, out):
+    """
+    filter_and_derive for many roll signals with the same time step, in parallel over the signals.
+
+    Parameters
+    ----------
+    x : ndarray
+        roll angles [rad], shape (n_signals, n_max), signal j is x[j, :lengths[j]]
+    lengths : ndarray
+        length of each signal (all must be greater than padlen)
+    sos, zi, padlen, dt :
+        as filter_and_derive
+    out : ndarray
+        shape (n_signals, 3, n_max), the results for signal j are stored in out[j, :, :lengths[j]]
+    """
+    for j in prange(x.shape[0]):
+        n = lengths[j]
+        filter_and_derive(x[j, :n], sos, zi, padlen, dt, out[j, :, :n])
+
+
+@njit(cache=True)
+def sums_of_squares(y_true, y_pred):
+    """
+    Residual and total sum of squares for the coefficient of determination, without any temporary arrays.
+
+    Returns
+    -------
+    u : float
+        ((y_true - y_pred)**2).sum()
+    v : float
+        ((y_true - y_true.mean())**2).sum()
+    """
+    n = len(y_true)
+    mean = 0.0
+    for i in range(n):
+        mean += y_true[i]
+    mean /= n
+
+    u = 0.0
+    v = 0.0
+    for i in range(n):
+        residual = y_true[i] - y_pred[i]
+        u += residual * residual
+        deviation = y_true[i] - mean
+        v += deviation * deviation
+
+    return u, v
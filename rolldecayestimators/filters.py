@@ -1,5 +1,8 @@
+import numpy as np
 from scipy import signal
 
+from rolldecayestimators import filter_kernels
+
 def butter_lowpass(cutoff, fs, order=5):
     nyq = 0.5 * fs
     normal_cutoff = cutoff / nyq
@@ -16,4 +19,166 @@ def lowpass_filter(data, cutoff, fs, order=5):
     #y = signal.lfilter(b, a, data)
     y = signal.filtfilt(b, a, data)
 
-    return y
\ No newline at end of file
+    return y
+
+def butter_lowpass_sos(cutoff, fs, order=5):
+    """
+    Butterworth lowpass filter as second order sections (numerically more robust than b, a for high orders and low
+    cutoff/fs)
+
+    Returns
+    -------
+    sos : ndarray
+        second order sections or None if the filter is disabled (cutoff or order is None)
+    """
+    if cutoff is None or order is None:
+        # Disabled filter:
+        return None
+
+    nyq = 0.5 * fs
+    normal_cutoff = cutoff / nyq
+    return signal.butter(order, normal_cutoff, btype='low', analog=False, output='sos')
+
+def lowpass_filter_sos(data, sos):
+    """
+    Forward-backward (zero phase) filtering of data with a filter designed by butter_lowpass_sos
+    """
+    if sos is None:
+        # Disabled filter:
+        return data
+
+    return signal.sosfiltfilt(sos, data)
+
+def derivative(data, dt):
+    """
+    Derivative of a signal with constant time step dt (same result as np.gradient(data, dt)).
+
+    Central differences are used in the interior and one sided differences at the ends. The differences are written
+    straight into the result array, so no temporary arrays are created.
+
+    Parameters
+    ----------
+    data : array
+        signal
+    dt : float
+        time step [s]
+
+    Returns
+    -------
+    derivative : ndarray
+    """
+    data = np.asarray(data, dtype=float)
+    result = np.empty_like(data)
+    np.subtract(data[2:], data[:-2], out=result[1:-1])
+    result[1:-1] *= 1 / (2 * dt)
+    result[0] = (data[1] - data[0]) / dt
+    result[-1] = (data[-1] - data[-2]) / dt
+    return result
+
+def lowpass_filter_and_derivatives(data, sos, dt):
+    """
+    Zero phase lowpass filter a signal with constant time step and calculate its first and second derivatives.
+
+    The compiled kernel in filter_kernels.py is used if numba is installed, otherwise lowpass_filter_sos and
+    derivative (same results).
+
+    Parameters
+    ----------
+    data : array
+        signal (float32 data gives float32 results, the calculations are done in float64)
+    sos : ndarray
+        filter from butter_lowpass_sos (None: no filtering)
+    dt : float
+        time step [s]
+
+    Returns
+    -------
+    filtered, first_derivative, second_derivative : ndarray
+        rows of one (3, len(data)) array
+    """
+    data = np.asarray(data)
+    dtype = np.float32 if data.dtype == np.float32 else np.float64
+    out = np.empty((3, len(data)), dtype=dtype)
+
+    if sos is None or not filter_kernels.NUMBA:
+        out[0] = filtered = np.asarray(lowpass_filter_sos(data=data, sos=sos), dtype=float)
+        out[1] = first_derivative = derivative(filtered, dt=dt)
+        out[2] = derivative(first_derivative, dt=dt)
+        return out[0], out[1], out[2]
+
+    # Same padding as signal.sosfiltfilt:
+    ntaps = 2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+    padlen = 3 * ntaps
+    if len(data) <= padlen:
+        raise ValueError('The length of the input vector x must be greater than padlen, which is %i.' % padlen)
+
+    data = np.ascontiguousarray(data, dtype=float)
+    filter_kernels.filter_and_derive(data, sos, signal.sosfilt_zi(sos), padlen, float(dt), out)
+    return out[0], out[1], out[2]
+
+def lowpass_filter_and_derivatives_batch(signals, sos, dt):
+    """
+    lowpass_filter_and_derivatives for many signals with the same time step. The signals are filtered in parallel
+    (over the signals) if numba is installed, otherwise one at a time.
+
+    Parameters
+    ----------
+    signals : list
+        signals (arrays of any lengths)
+    sos : ndarray
+        filter from butter_lowpass_sos (None: no filtering)
+    dt : float
+        time step [s]
+
+    Returns
+    -------
+    results : list
+        (filtered, first_derivative, second_derivative) for each signal
+    """
+    signals = [np.asarray(data) for data in signals]
+    if sos is None or not filter_kernels.NUMBA or len(signals) == 0:
+        return [lowpass_filter_and_derivatives(data=data, sos=sos, dt=dt) for data in signals]
+
+    ntaps = 2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+    padlen = 3 * ntaps
+    lengths = np.array([len(data) for data in signals], dtype=np.int64)
+    if lengths.min() <= padlen:
+        raise ValueError('The length of the input vector x must be greater than padlen, which is %i.' % padlen)
+
+    # The signals are padded to the same length:
+    x = np.zeros((len(signals), lengths.max()))
+    for j, data in enumerate(signals):
+        x[j, :len(data)] = data
+
+    out = np.empty((len(signals), 3, x.shape[1]))
+    filter_kernels.filter_and_derive_batch(x, lengths, sos, signal.sosfilt_zi(sos), padlen, float(dt), out)
+
+    results = []
+    for j, data in enumerate(signals):
+        n = len(data)
+        result = out[j, :, :n].astype(np.float32) if data.dtype == np.float32 else out[j, :, :n]
+        results.append((result[0], result[1], result[2]))
+
+    return results
+
+def r2_score(y_true, y_pred):
+    """
+    Coefficient of determination (same as sklearn.metrics.r2_score for one output), used to score the filtering.
+
+    The sums of squares are calculated in one compiled pass if numba is installed.
+    """
+    y_true = np.ascontiguousarray(y_true, dtype=float)
+    y_pred = np.ascontiguousarray(y_pred, dtype=float)
+    if filter_kernels.NUMBA:
+        u, v = filter_kernels.sums_of_squares(y_true, y_pred)
+    else:
+        residual = y_true - y_pred
+        u = residual @ residual
+        deviation = y_true - y_true.mean()
+        v = deviation @ deviation
+
+    if v == 0:
+        # (as sklearn: perfect predictions of a constant get 1, otherwise 0)
+        return 1.0 if u == 0 else 0.0
+
+    return 1 - u / v
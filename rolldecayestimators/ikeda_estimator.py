@@ -25,7 +25,8 @@ class IkedaEstimator(DirectEstimator):
                        ]
 
     def __init__(self, lpp:float, TA, TF, beam, BKL, BKB, A0, kg, Volume, gm, V, rho=1000, g=9.81, phi_max=8, omega0=None,
-                 verify_input = True, limit_inputs=False, **kwargs):
+                 verify_input = True, limit_inputs=False, backend='solve_ivp',
+                 ode_method='RK45', **kwargs):
         """
         Estimate a roll decay test using the Simplified Ikeda Method to predict roll damping.
         NOTE! This method is currently only valid for zero speed!
@@ -62,10 +63,14 @@ class IkedaEstimator(DirectEstimator):
             max roll angle during test [deg]
         omega0
             Natural frequency of motion [rad/s], if None it will be calculated with fft of signal
+        backend
+            ODE integration with: 'solve_ivp', 'odeint', 'numba' or 'cvode' (see RollDecay)
+        ode_method
+            solve_ivp method (ex: 'RK45' or 'Radau')
 
         For more info see: "rolldecaysestimators/simplified_ikeda.py"
         """
-        super().__init__(omega0=omega0)
+        super().__init__(omega0=omega0, backend=backend, ode_method=ode_method)
 
         self.lpp=lpp
         self.TA=TA
@@ -0,0 +1,199 @@
+"""
+Compiled ODE integration of the roll decay equation.
+
+The Runge-Kutta loop and the acceleration are compiled together with numba, so that the integration runs without
+any calls back to Python. Without numba the same code runs as plain (slow) Python.
+"""
+import inspect
+import numpy as np
+
+from rolldecayestimators._numba import njit
+
+# Dormand-Prince 5(4) coefficients (same as RK45 in scipy.integrate.solve_ivp).
+# (The nodes C are not needed since the roll decay equation does not depend on time.)
+A = np.array([
+    [0, 0, 0, 0, 0],
+    [1/5, 0, 0, 0, 0],
+    [3/40, 9/40, 0, 0, 0],
+    [44/45, -56/15, 32/9, 0, 0],
+    [19372/6561, -25360/2187, 64448/6561, -212/729, 0],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656]
+])
+B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+
+SAFETY = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 10.0
+ERROR_EXPONENT = -1/5
+
+_positional_accelerations = {}
+
+
+def positional_acceleration(acceleration, parameter_names):
+    """
+    Generate a compiled function: acceleration_positional(phi, phi1d, parameters) that calls the lambdified
+    acceleration with the arguments in the right order. parameters is an array with the values of parameter_names
+    so that the function has the same types for all models.
+
+    Parameters
+    ----------
+    acceleration
+        lambdified (and jitted) acceleration with arguments: phi, phi1d and the parameters
+    parameter_names : list
+        order of the parameters in the parameters array
+
+    Returns
+    -------
+    acceleration_positional
+    """
+    key = (acceleration, tuple(parameter_names))
+    if key in _positional_accelerations:
+        return _positional_accelerations[key]
+
+    arguments = []
+    for name in inspect.signature(acceleration).parameters.keys():
+        if name in ['phi', 'phi1d']:
+            arguments.append(name)
+        else:
+            arguments.append('parameters[%i]' % list(parameter_names).index(name))
+
+    source = 'def acceleration_positional(phi, phi1d, parameters):\n'
+    source += '    return acceleration(%s)\n' % ', '.join(arguments)
+    namespace = {'acceleration': acceleration}
+    exec(source, namespace)
+    function = njit(namespace['acceleration_positional'])
+    _positional_accelerations[key] = function
+    return function
+
+
+@njit
+def _norm(x0, x1):
+    return np.sqrt((x0 ** 2 + x1 ** 2) / 2)
+
+
+@njit
+def _initial_step(acceleration, phi, phi1d, phi2d, parameters, rtol, atol):
+    scale0 = atol + np.abs(phi) * rtol
+    scale1 = atol + np.abs(phi1d) * rtol
+    d0 = _norm(phi / scale0, phi1d / scale1)
+    d1 = _norm(phi1d / scale0, phi2d / scale1)
+    if d0 < 1e-5 or d1 < 1e-5:
+        h0 = 1e-6
+    else:
+        h0 = 0.01 * d0 / d1
+
+    phi1d_1 = phi1d + h0 * phi2d
+    phi2d_1 = acceleration(phi + h0 * phi1d, phi1d_1, parameters)
+    d2 = _norm((phi1d_1 - phi1d) / scale0, (phi2d_1 - phi2d) / scale1) / h0
+
+    if d1 <= 1e-15 and d2 <= 1e-15:
+        h1 = max(1e-6, h0 * 1e-3)
+    else:
+        h1 = (0.01 / max(d1, d2)) ** (1 / 5)
+
+    return min(100 * h0, h1)
+
+
+@njit
+def dopri5(acceleration, t_eval, y0, parameters, rtol=1e-3, atol=1e-6):
+    """
+    Integrate [phi1d, phi2d] with an explicit Runge-Kutta method of order 5(4) with adaptive step size
+    (same method and step size control as RK45 in solve_ivp). The steps are shortened to end exactly at each time
+    in t_eval. The two states are kept as scalars, so that there are no array allocations in the loop.
+
+    Parameters
+    ----------
+    acceleration
+        compiled function: acceleration(phi, phi1d, parameters), see positional_acceleration
+    t_eval : array
+        times where the states are stored [s] (t_eval[0] is the initial time)
+    y0 : array
+        initial states [phi, phi1d]
+    parameters : array
+        parameters for the acceleration
+    rtol, atol : float
+        relative and absolute tolerance
+
+    Returns
+    -------
+    states : ndarray
+        shape (2, len(t_eval)) with phi and phi1d
+    success : bool
+        False if the step size became too small
+    """
+    n = len(t_eval)
+    states = np.empty((2, n))
+    states[:, 0] = y0
+
+    phi = y0[0]
+    phi1d = y0[1]
+    phi2d = acceleration(phi, phi1d, parameters)
+    t = t_eval[0]
+    h_abs = _initial_step(acceleration, phi, phi1d, phi2d, parameters, rtol, atol)
+
+    # Stages of phi (K0) and phi1d (K1):
+    K0 = np.empty(7)
+    K1 = np.empty(7)
+
+    for i in range(1, n):
+        t_end = t_eval[i]
+        while t < t_end:
+            min_step = 10 * np.abs(np.nextafter(t, np.inf) - t)
+            if h_abs < min_step:
+                return states, False
+
+            h = min(h_abs, t_end - t)
+
+            K0[0] = phi1d
+            K1[0] = phi2d
+            for s in range(1, 6):
+                dphi = 0.0
+                dphi1d = 0.0
+                for j in range(s):
+                    dphi += A[s, j] * K0[j]
+                    dphi1d += A[s, j] * K1[j]
+                K0[s] = phi1d + h * dphi1d
+                K1[s] = acceleration(phi + h * dphi, K0[s], parameters)
+
+            phi_new = phi
+            phi1d_new = phi1d
+            for j in range(6):
+                phi_new += h * B[j] * K0[j]
+                phi1d_new += h * B[j] * K1[j]
+            phi2d_new = acceleration(phi_new, phi1d_new, parameters)
+            K0[6] = phi1d_new
+            K1[6] = phi2d_new
+
+            error0 = 0.0
+            error1 = 0.0
+            for j in range(7):
+                error0 += h * E[j] * K0[j]
+                error1 += h * E[j] * K1[j]
+            scale0 = atol + max(np.abs(phi), np.abs(phi_new)) * rtol
+            scale1 = atol + max(np.abs(phi1d), np.abs(phi1d_new)) * rtol
+            error_norm = _norm(error0 / scale0, error1 / scale1)
+
+            if error_norm < 1:
+                if error_norm == 0:
+                    factor = MAX_FACTOR
+                else:
+                    factor = min(MAX_FACTOR, SAFETY * error_norm ** ERROR_EXPONENT)
+
+                if h < h_abs:
+                    # Shortened step to reach t_end, keep the step size that the error control has found:
+                    h_abs = max(h_abs, h * factor)
+                else:
+                    h_abs = h * factor
+
+                t = t + h if h < t_end - t else t_end
+                phi = phi_new
+                phi1d = phi1d_new
+                phi2d = phi2d_new
+            else:
+                h_abs = h * max(MIN_FACTOR, SAFETY * error_norm ** ERROR_EXPONENT)
+
+        states[0, i] = phi
+        states[1, i] = phi1d
+
+    return states, True
@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd
+import scipy.fft
 from rolldecayestimators import lambdas
 
 def sample_increase(X, increase=5):
@@ -70,6 +71,54 @@ def get_peaks(X:pd.DataFrame, key='phi1d')->pd.DataFrame:
 
     return X_zerocrossings
 
+def get_peaks_array(t:np.ndarray, phi:np.ndarray, phi1d:np.ndarray, increase=5)->tuple:
+    """
+    Same as get_peaks(sample_increase(X, increase)) but with numpy arrays instead of a DataFrame. Only phi1d is
+    interpolated at all the increased samples, phi is only interpolated at the samples around the peaks.
+
+    Parameters
+    ----------
+    t : array
+        time [s] (increasing)
+    phi : array
+        roll angle [rad]
+    phi1d : array
+        roll velocity [rad/s]
+    increase : int
+        sample increase before the zero crossings of phi1d are searched
+
+    Returns
+    -------
+    t_interpolated, phi1d_interpolated : ndarray
+        time and roll velocity after the sample increase
+    t_peaks, phi_peaks : ndarray
+        time and roll angle at the peaks (where phi1d is 0)
+    """
+    t_interpolated = np.linspace(t[0], t[-1], len(t) * increase)
+    phi1d_interpolated = np.interp(t_interpolated, t, phi1d)
+
+    # Sign change of phi1d between two samples:
+    y1_all = phi1d_interpolated[0:-1]
+    y2_all = phi1d_interpolated[1:]
+    mask = ((y1_all > 0) & (y2_all < 0)) | ((y1_all < 0) & (y2_all > 0))
+    index_first = np.flatnonzero(mask)
+    index_second = index_first + 1
+
+    # Linear interpolation to phi1d = 0 (as in get_peaks):
+    x1 = t_interpolated[index_first]
+    x2 = t_interpolated[index_second]
+    y1 = phi1d_interpolated[index_first]
+    y2 = phi1d_interpolated[index_second]
+    k = (y2 - y1) / (x2 - x1)
+    m = y1 - k * x1
+    t_peaks = -m / k
+
+    factor = (t_peaks - x1) / (x2 - x1)
+    phi1 = np.interp(x1, t, phi)
+    phi_peaks = phi1 + (np.interp(x2, t, phi) - phi1) * factor
+
+    return t_interpolated, phi1d_interpolated, t_peaks, phi_peaks
+
 def calculate_amplitudes(X_zerocrossings):
 
     X_amplitudes = pd.DataFrame()
@@ -140,12 +189,12 @@ def fft(series):
     signal = series.values
     time = series.index
 
-    dt = np.mean(np.diff(time))
+    dt = (time[-1] - time[0])/(len(time) - 1)  # mean time step
     #n = 11*len(time)
     n = 50000
-    frequencies = np.fft.rfftfreq(n=n, d=dt) # [Hz]
+    frequencies = scipy.fft.rfftfreq(n=n, d=dt) # [Hz]
 
-    dft = np.abs(np.fft.rfft(signal, n=n))
+    dft = np.abs(scipy.fft.rfft(signal, n=n))
 
     return frequencies, dft
 
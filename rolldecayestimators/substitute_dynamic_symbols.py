@@ -5,6 +5,8 @@ import pandas as pd
 from sympy.core.numbers import Float
 import numpy as np
 
+from rolldecayestimators._numba import njit, NUMBA
+
 def substitute_dynamic_symbols(expression):
     dynamic_symbols = me.find_dynamicsymbols(expression)
     derivatives = find_derivatives(dynamic_symbols)
@@ -72,7 +74,12 @@ def find_derivative_name(derivative):
     return name
 
 
-def lambdify(expression):
+def lambdify(expression, **kwargs):
+    """
+    Lambdify an expression where the dynamic symbols are substituted (phi(t).diff() --> phi1d etc.).
+    The arguments of the function are the free symbols in alphabetical order.
+    kwargs are passed on to sympy.lambdify (ex: cse=True).
+    """
     new_expression = substitute_dynamic_symbols(expression)
     args = new_expression.free_symbols
 
@@ -82,9 +89,63 @@ def lambdify(expression):
     for symbol_name in sorted(symbol_dict.keys()):
         symbols.append(symbol_dict[symbol_name])
 
-    lambda_function = sp.lambdify(symbols, new_expression, modules='numpy')
+    lambda_function = sp.lambdify(symbols, new_expression, modules='numpy', **kwargs)
+    return lambda_function
+
+def lambdify_derivatives(expression, symbol_names=None, **kwargs):
+    """
+    Lambdify the partial derivatives of an expression.
+    The function has the same arguments as lambdify(expression) and returns a tuple with the derivatives with respect
+    to the symbols in symbol_names.
+
+    Parameters
+    ----------
+    expression
+        Sympy expression
+    symbol_names : list
+        names of the symbols (ex: ['phi','phi1d']), default: all arguments (the gradient)
+    kwargs
+        passed on to sympy.lambdify (ex: cse=True)
+
+    Returns
+    -------
+        lambda function
+    """
+    new_expression = substitute_dynamic_symbols(expression)
+    symbols = sorted(new_expression.free_symbols, key=lambda symbol: symbol.name)
+
+    # Real symbols, so that Abs(x).diff(x) --> sign(x):
+    real_symbols = {symbol.name: sp.Symbol(symbol.name, real=True) for symbol in symbols}
+    new_expression = new_expression.subs([(symbol, real_symbols[symbol.name]) for symbol in symbols])
+
+    if symbol_names is None:
+        symbol_names = [symbol.name for symbol in symbols]
+
+    derivatives = sp.Tuple(*[new_expression.diff(real_symbols[name]) for name in symbol_names])
+    arguments = [real_symbols[symbol.name] for symbol in symbols]
+    lambda_function = sp.lambdify(arguments, derivatives, modules='numpy', **kwargs)
     return lambda_function
 
+def jit(function, **kwargs):
+    """
+    Compile a lambdified function to machine code with numba (if installed).
+    Compilation is lazy, it is done at the first call for each new combination of argument types.
+    Parameters
+    ----------
+    function
+        Python function from lambdify, called with scalars.
+    kwargs
+        passed on to numba.njit (ex: cache=True, only for functions defined in a source file)
+
+    Returns
+    -------
+        numba dispatcher or the function itself if numba is not installed.
+    """
+    if not NUMBA:
+        return function
+
+    return njit(**kwargs)(function)
+
 def run(function,inputs, **kwargs):
 
     inputs=inputs.copy()
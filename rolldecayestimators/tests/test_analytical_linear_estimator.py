@@ -64,4 +64,21 @@ def test_fit_simualtion2(df_roll_decay_minus):
     plt.show()
 
     assert_almost_equal(X['phi'].values, X_pred['phi'].values, decimal=3)
-    assert direct_estimator.score(X) > 0.999
\ No newline at end of file
+    assert direct_estimator.score(X) > 0.999
+
+
+def test_true_and_prediction(df_roll_decay):
+
+    direct_estimator = AnalyticalLinearEstimator(fit_method='integration')
+
+    X = df_roll_decay
+    X['phi2d'] = np.gradient(X['phi1d'].values, X.index.values)
+
+    direct_estimator.fit(X=X)
+    y_true, y_pred = direct_estimator.true_and_prediction(X=X)
+    pd.testing.assert_index_equal(y_true.index, X.index)
+    pd.testing.assert_index_equal(y_pred.index, X.index)
+    assert_almost_equal(y_pred.values, direct_estimator.predict(X=X)['phi'].values)
+
+    error = direct_estimator.measure_error(X=X)
+    pd.testing.assert_index_equal(error.index, X.index)
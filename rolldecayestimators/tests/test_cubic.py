@@ -1,6 +1,8 @@
 import pytest
+import inspect
 
 import pandas as pd
+import sympy as sp
 import numpy as np
 from numpy.testing import assert_almost_equal
 from rolldecayestimators.direct_estimator_cubic import EstimatorCubic, EstimatorQuadraticB, EstimatorLinear
@@ -380,3 +382,224 @@ def test_result_for_database():
     assert_almost_equal(s['A_44'],A_44)
     B_1 = s['B_1A']*A_44
     assert_almost_equal(s['B_1'],B_1)
+
+def test_fit_many():
+
+    parameters_runs = [
+        {'B_1A':0.7, 'B_2A':1.0, 'B_3A':0.0, 'C_1A':10.0, 'C_3A':0.0, 'C_5A':0.0},
+        {'B_1A':0.3, 'B_2A':0.5, 'B_3A':0.0, 'C_1A':8.0, 'C_3A':0.0, 'C_5A':0.0},
+        {'B_1A':0.1, 'B_2A':2.0, 'B_3A':0.0, 'C_1A':5.0, 'C_3A':0.0, 'C_5A':0.0},
+        {'B_1A':0.5, 'B_2A':0.1, 'B_3A':0.0, 'C_1A':12.0, 'C_3A':0.0, 'C_5A':0.0},
+    ]
+
+    phi0 = np.deg2rad(10)
+    phi1d0 = 0
+    t = np.arange(0, 10, 0.01)
+    Xs = [simulate(t=t, phi0=phi0, phi1d0=phi1d0, **parameters) for parameters in parameters_runs]
+
+    direct_estimator = EstimatorQuadraticB(fit_method='integration')
+    estimators = direct_estimator.fit_many(Xs=Xs, n_jobs=2)
+
+    assert len(estimators) == len(Xs)
+    assert not direct_estimator.is_fitted_
+    for estimator, X, parameters in zip(estimators, Xs, parameters_runs):
+        check(X=X, estimator=estimator, parameters=parameters)
+
+        # Each test is fitted on its own, so all parameters are found accurately:
+        for key, value in estimator.parameters.items():
+            assert_almost_equal(value, parameters[key], decimal=4)
+
+def test_simulation_numba():
+
+    parameters={
+        'B_1A':0.7,
+        'B_2A':1.0,
+        'B_3A':3.0,
+        'C_1A':10.0,
+        'C_3A':10.0,
+        'C_5A':0.0,
+    }
+
+    phi0 = np.deg2rad(20)
+    phi1d0 = 0
+    t = np.arange(0, 10, 0.01)
+    X = simulate(t=t, phi0=phi0, phi1d0=phi1d0, **parameters)
+
+    direct_estimator = EstimatorCubic.load(**parameters)
+    direct_estimator.backend = 'numba'
+    X_numba = direct_estimator.simulate(t=t, phi0=phi0, phi1d0=phi1d0)
+    assert_almost_equal(X['phi'].values, X_numba['phi'].values, decimal=2)
+
+def test_simulation_odeint():
+
+    parameters={
+        'B_1A':0.7,
+        'B_2A':1.0,
+        'B_3A':3.0,
+        'C_1A':10.0,
+        'C_3A':10.0,
+        'C_5A':0.0,
+    }
+
+    phi0 = np.deg2rad(20)
+    phi1d0 = 0
+    t = np.arange(0, 10, 0.01)
+    X = simulate(t=t, phi0=phi0, phi1d0=phi1d0, **parameters)
+
+    direct_estimator = EstimatorCubic.load(**parameters)
+    direct_estimator.backend = 'odeint'
+    X_odeint = direct_estimator.simulate(t=t, phi0=phi0, phi1d0=phi1d0)
+    assert_almost_equal(X['phi'].values, X_odeint['phi'].values, decimal=2)
+
+def test_simulation_jacobian():
+
+    parameters={
+        'B_1A':0.7,
+        'B_2A':1.0,
+        'B_3A':3.0,
+        'C_1A':10.0,
+        'C_3A':10.0,
+        'C_5A':0.0,
+    }
+
+    phi0 = np.deg2rad(20)
+    phi1d0 = 0
+    t = np.arange(0, 10, 0.01)
+    X = simulate(t=t, phi0=phi0, phi1d0=phi1d0, **parameters)
+
+    direct_estimator = EstimatorCubic.load(**parameters)
+    direct_estimator.set_params(ode_method='Radau')
+    X_radau = direct_estimator.simulate(t=t, phi0=phi0, phi1d0=phi1d0)
+    assert direct_estimator.simulation_result.njev > 0
+    assert_almost_equal(X['phi'].values, X_radau['phi'].values, decimal=2)
+
+def test_fit_simualtion_numba():
+
+    parameters={
+        'B_1A':0.7,
+        'B_2A':1.0,
+        'B_3A':3.0,
+        'C_1A':10.0,
+        'C_3A':10.0,
+        'C_5A':0.0,
+    }
+
+    phi0 = np.deg2rad(20)
+    phi1d0 = 0
+    t = np.arange(0, 10, 0.01)
+    estimator = EstimatorCubic.load(**parameters)
+    estimator.backend = 'numba'
+    X = estimator.simulate(t=t, phi0=phi0, phi1d0=phi1d0)
+
+    direct_estimator = EstimatorCubic(fit_method='integration', backend='numba')
+    check(X=X, estimator=direct_estimator, parameters=parameters)
+
+def test_estimator_integration_wrong_parameter_name():
+
+    parameters={
+        'B_1A':0.7,
+        'B_2A':1.0,
+        'B_3A':3.0,
+        'C_1A':10.0,
+        'C_3A':10.0,
+        'C_5A':0.0,
+    }
+
+    direct_estimator = EstimatorCubic.load(**parameters)
+    parameter_names = tuple(parameters.keys())[:-1] + ('C_5',)
+    t = np.arange(0, 10, 0.01)
+    with pytest.raises(ValueError):
+        direct_estimator.estimator_integration(t=t, phi0=np.deg2rad(20), phi1d0=0, parameter_names=parameter_names,
+                                               x=list(parameters.values()))
+
+def test_backend_parameter():
+    direct_estimator = EstimatorCubic(backend='numba')
+    assert direct_estimator.get_params()['backend'] == 'numba'
+    direct_estimator.set_params(backend='odeint')
+    assert direct_estimator.backend == 'odeint'
+
+def test_ode_method_parameter():
+    direct_estimator = EstimatorCubic(ode_method='Radau')
+    assert direct_estimator.get_params()['ode_method'] == 'Radau'
+
+def test_fit_simualtion_derivation_jacobian():
+
+    parameters={
+        'B_1A':0.7,
+        'B_2A':1.0,
+        'B_3A':3.0,
+        'C_1A':10.0,
+        'C_3A':10.0,
+        'C_5A':0.0,
+    }
+
+    phi0 = np.deg2rad(20)
+    phi1d0 = 0
+    t = np.arange(0, 10, 0.01)
+    X = simulate(t=t, phi0=phi0, phi1d0=phi1d0, **parameters)
+
+    direct_estimator = EstimatorCubic(fit_method='derivation')
+    check(X=X, estimator=direct_estimator, parameters=parameters)
+
+    # The analytic jacobian should be the same as a finite difference approximation:
+    x = direct_estimator.result.x
+    jacobian = direct_estimator.error_jacobian(x, direct_estimator)
+    for i in range(len(x)):
+        dx = np.zeros(len(x))
+        dx[i] = 1e-6
+        difference = (direct_estimator.error(x + dx, direct_estimator) - direct_estimator.error(x, direct_estimator)) / dx[i]
+        assert_almost_equal(jacobian[:, i], difference, decimal=4)
+
+def test_cubic_functions_up_to_date():
+    """
+    _cubic_functions.py should be the same as a new build from the equations (python -m rolldecayestimators.build_cubic_functions)
+    """
+    from rolldecayestimators import build_cubic_functions, _cubic_functions
+
+    namespace = {}
+    exec(build_cubic_functions.build(), namespace)
+
+    for name, function in inspect.getmembers(_cubic_functions, inspect.isfunction):
+        arguments = {key: value for key, value in zip(inspect.signature(function).parameters.keys(),
+                                                       np.random.default_rng(0).uniform(0.1, 2, 10))}
+        assert_almost_equal(function(**arguments), namespace[name](**arguments))
+
+def test_model_equations():
+    """
+    The sympy equations of the estimators should be the models of their generated functions
+    """
+    from rolldecayestimators import direct_estimator_cubic
+    from rolldecayestimators.substitute_dynamic_symbols import lambdify
+
+    for estimator in [direct_estimator_cubic.EstimatorCubic, direct_estimator_cubic.EstimatorQuadraticB,
+                      direct_estimator_cubic.EstimatorQuadraticBandC, direct_estimator_cubic.EstimatorQuadratic,
+                      direct_estimator_cubic.EstimatorLinear]:
+        function = estimator.functions['acceleration']
+        acceleration = lambdify(estimator.acceleration)
+        arguments = {key: value for key, value in zip(inspect.signature(function).parameters.keys(),
+                                                       np.random.default_rng(0).uniform(0.1, 2, 10))}
+        assert_almost_equal(acceleration(**arguments), function(**arguments))
+        assert isinstance(estimator.roll_decay_equation_A, sp.Eq)
+
+def test_simulation_cvode():
+
+    pytest.importorskip('scikits.odes')
+
+    parameters={
+        'B_1A':0.7,
+        'B_2A':1.0,
+        'B_3A':3.0,
+        'C_1A':10.0,
+        'C_3A':10.0,
+        'C_5A':0.0,
+    }
+
+    phi0 = np.deg2rad(20)
+    phi1d0 = 0
+    t = np.arange(0, 10, 0.01)
+    X = simulate(t=t, phi0=phi0, phi1d0=phi1d0, **parameters)
+
+    direct_estimator = EstimatorCubic.load(**parameters)
+    direct_estimator.backend = 'cvode'
+    X_cvode = direct_estimator.simulate(t=t, phi0=phi0, phi1d0=phi1d0)
+    assert_almost_equal(X['phi'].values, X_cvode['phi'].values, decimal=2)
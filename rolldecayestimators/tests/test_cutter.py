@@ -5,6 +5,7 @@ import numpy as np
 from numpy.testing import assert_almost_equal
 from rolldecayestimators.direct_estimator import DirectEstimator
 from rolldecayestimators.transformers import CutTransformer
+from rolldecayestimators import measure
 import matplotlib.pyplot as plt
 
 @pytest.fixture
@@ -48,3 +49,87 @@ def test_cutter(df_roll_decay):
     plt.show()
 
 
+
+A = 0.2  # Initial roll amplitude [rad]
+a = 0.05  # Decay rate [1/s]
+omega = 0.5  # Damped natural frequency [rad/s]
+
+@pytest.fixture
+def df_damped_cosine():
+    """
+    phi = A*exp(-a*t)*cos(omega*t), where the peaks (phi1d = 0) are known analytically
+    """
+    t = np.arange(0, 120, 0.01)
+    phi = A*np.exp(-a*t)*np.cos(omega*t)
+    phi1d = A*np.exp(-a*t)*(-a*np.cos(omega*t) - omega*np.sin(omega*t))
+    yield pd.DataFrame({'phi':phi, 'phi1d':phi1d}, index=t)
+
+def peak(k):
+    """
+    Time and absolute roll angle of peak k of the damped cosine
+    """
+    t = (k*np.pi - np.arctan(a/omega))/omega
+    return t, A*np.cos(np.arctan(a/omega))*np.exp(-a*t)
+
+def test_get_peaks_array(df_damped_cosine):
+    X = df_damped_cosine
+    X_interpolated = measure.sample_increase(X)
+    X_zerocrossings = measure.get_peaks(X_interpolated)
+
+    t_interpolated, phi1d_interpolated, t_peaks, phi_peaks = measure.get_peaks_array(t=X.index.to_numpy(),
+                                                                                     phi=X['phi'].to_numpy(),
+                                                                                     phi1d=X['phi1d'].to_numpy())
+    assert_almost_equal(t_interpolated, X_interpolated.index)
+    assert_almost_equal(phi1d_interpolated, X_interpolated['phi1d'])
+    assert_almost_equal(t_peaks, X_zerocrossings.index)
+    assert_almost_equal(phi_peaks, X_zerocrossings['phi'])
+
+    ks = np.arange(1, len(t_peaks) + 1)
+    t_true, phi_true = peak(ks)
+    assert_almost_equal(t_peaks, t_true, decimal=3)
+    assert_almost_equal(np.abs(phi_peaks), phi_true, decimal=5)
+
+def test_cut(df_damped_cosine):
+    X = df_damped_cosine
+    dt = 0.01
+
+    # Cut from peak 3 (the first one below phi_max) to peak 7 (the first one below phi_min):
+    t_start, phi_start = peak(3)
+    t_stop, phi_stop = peak(7)
+    phi_max = (peak(2)[1] + phi_start)/2
+    phi_min = (peak(6)[1] + phi_stop)/2
+
+    cut_transformer = CutTransformer(phi_max=phi_max, phi_min=phi_min)
+    X_cut = cut_transformer.fit_transform(X)
+
+    assert t_start < X_cut.index[0] <= t_start + dt
+    assert t_stop - dt <= X_cut.index[-1] < t_stop
+    pd.testing.assert_frame_equal(X_cut, X.loc[X_cut.index[0]:X_cut.index[-1]])
+
+def test_cut_float32(df_damped_cosine):
+    X = df_damped_cosine
+    X_32 = X.astype(np.float32)
+
+    cut_transformer = CutTransformer(phi_max=np.deg2rad(5), phi_min=np.deg2rad(0.5))
+    X_cut = cut_transformer.fit_transform(X)
+    X_cut_32 = cut_transformer.fit_transform(X_32)
+
+    assert all(dtype == np.float32 for dtype in X_cut_32.dtypes)
+    pd.testing.assert_index_equal(X_cut_32.index, X_cut.index)
+
+def test_cut_nothing_left(df_damped_cosine):
+    cut_transformer = CutTransformer(phi_max=np.deg2rad(1), phi_min=np.deg2rad(5))
+    cut_transformer.fit(df_damped_cosine)
+    with pytest.raises(ValueError):
+        cut_transformer.transform(df_damped_cosine)
+
+def test_cut_does_not_change_X(df_damped_cosine):
+    X = df_damped_cosine
+    X_original = X.copy()
+
+    cut_transformer = CutTransformer(phi_max=np.deg2rad(5), phi_min=np.deg2rad(0.5))
+    X_cut = cut_transformer.fit_transform(X)
+    X_cut['phi'] = 0.0
+    X_cut.iloc[0, 1] = 1.0
+
+    pd.testing.assert_frame_equal(X, X_original)
@@ -110,6 +110,18 @@ def test_roll_decay_integration_no_omega():
     X = simulator(estimator=estimator)
     check(X=X, estimator=estimator)
 
+def test_omega0_refit():
+
+    estimator = RollDecay(fit_method='integration', omega_regression=False)
+    X = simulator(estimator=estimator)
+    estimator.fit(X=X)
+    assert_almost_equal(estimator.omega0, omega0, decimal=2)
+
+    X2 = X.copy()
+    X2.index = X.index/2  # twice the frequency
+    estimator.fit(X=X2)
+    assert_almost_equal(estimator.omega0, 2*omega0, decimal=2)
+
 def test_roll_decay_integration_sparse():
 
     estimator = RollDecay(fit_method='integration', omega_regression=True)
@@ -0,0 +1,60 @@
+import pytest
+import numpy as np
+from scipy import signal
+from numpy.testing import assert_almost_equal
+from rolldecayestimators import filters
+
+dt = 0.01
+
+@pytest.fixture
+def phi():
+    t = np.arange(0, 60, dt)
+    rng = np.random.default_rng(0)
+    yield np.deg2rad(10)*np.exp(-0.05*t)*np.cos(0.5*t) + 0.001*rng.standard_normal(len(t))
+
+def test_derivative(phi):
+    assert_almost_equal(filters.derivative(phi, dt=dt), np.gradient(phi, dt))
+
+@pytest.mark.parametrize("order", [1, 3, 5])
+def test_lowpass_filter_and_derivatives(phi, order):
+
+    sos = filters.butter_lowpass_sos(cutoff=0.5, fs=1/dt, order=order)
+    phi_filtered, phi1d, phi2d = filters.lowpass_filter_and_derivatives(data=phi, sos=sos, dt=dt)
+
+    phi_filtered_scipy = signal.sosfiltfilt(sos, phi)
+    phi1d_scipy = np.gradient(phi_filtered_scipy, dt)
+    assert_almost_equal(phi_filtered, phi_filtered_scipy)
+    assert_almost_equal(phi1d, phi1d_scipy)
+    assert_almost_equal(phi2d, np.gradient(phi1d_scipy, dt))
+
+def test_lowpass_filter_and_derivatives_disabled(phi):
+    phi_filtered, phi1d, phi2d = filters.lowpass_filter_and_derivatives(data=phi, sos=None, dt=dt)
+    assert_almost_equal(phi_filtered, phi)
+    assert_almost_equal(phi1d, np.gradient(phi, dt))
+
+def test_lowpass_filter_and_derivatives_float32(phi):
+
+    sos = filters.butter_lowpass_sos(cutoff=0.5, fs=1/dt, order=5)
+    results = filters.lowpass_filter_and_derivatives(data=phi, sos=sos, dt=dt)
+    results_float32 = filters.lowpass_filter_and_derivatives(data=phi.astype(np.float32), sos=sos, dt=dt)
+
+    for result, result_float32 in zip(results, results_float32):
+        assert result_float32.dtype == np.float32
+        assert_almost_equal(result_float32/np.abs(result).max(), result/np.abs(result).max(), decimal=5)
+
+def test_r2_score(phi):
+    from sklearn.metrics import r2_score
+    phi_filtered = filters.lowpass_filter_sos(data=phi, sos=filters.butter_lowpass_sos(cutoff=0.5, fs=1/dt))
+    assert_almost_equal(filters.r2_score(y_true=phi, y_pred=phi_filtered), r2_score(y_true=phi, y_pred=phi_filtered))
+    assert filters.r2_score(y_true=np.ones(10), y_pred=np.ones(10)) == 1.0
+
+def test_lowpass_filter_and_derivatives_batch(phi):
+    sos = filters.butter_lowpass_sos(cutoff=0.5, fs=1/dt)
+    signals = [phi, phi[0:1000], phi[500:3000].astype(np.float32)]
+    results = filters.lowpass_filter_and_derivatives_batch(signals=signals, sos=sos, dt=dt)
+
+    assert len(results) == len(signals)
+    for signal_, result in zip(signals, results):
+        for array, expected in zip(result, filters.lowpass_filter_and_derivatives(data=signal_, sos=sos, dt=dt)):
+            assert array.dtype == expected.dtype
+            assert_almost_equal(array, expected)
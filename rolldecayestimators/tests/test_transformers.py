@@ -1,11 +1,13 @@
 import pytest
 import numpy as np
+import pandas as pd
+from sklearn.exceptions import NotFittedError
 
-from sklearn.utils.testing import assert_array_equal
-from sklearn.utils.testing import assert_allclose
+from numpy.testing import assert_array_equal
+from numpy.testing import assert_allclose
 
 from rolldecayestimators import DirectEstimator, CutTransformer
-from rolldecayestimators.transformers import OffsetTransformer
+from rolldecayestimators.transformers import OffsetTransformer, LowpassFilterDerivatorTransformer, ScaleFactorTransformer
 from rolldecayestimators.tests.test_cubic import simulate
 import matplotlib.pyplot as plt
 
@@ -27,6 +29,7 @@ def data():
 
     return X
 
+
 def test_offset_transformer(data):
     X = data
 
@@ -50,4 +53,96 @@ def test_offset_transformer(data):
     ax.legend()
     plt.show()
 
-    assert_allclose(X_trans['phi'], X['phi'], atol=0.01)
\ No newline at end of file
+    assert_allclose(X_trans['phi'], X['phi'], atol=0.01)
+
+
+def test_lowpass_transformer_changed_X(data):
+    X = data.copy()
+    trans = LowpassFilterDerivatorTransformer(cutoff=2, minimum_score=0.9)
+    trans.fit(X=X)
+
+    # Changing the fitted X in place (twice the time) should give the same result as a new X:
+    X.index = X.index*2
+    assert_allclose(trans.transform(X=X)['phi1d'], trans.transform(X=X.copy())['phi1d'])
+    assert_allclose(trans.transform(X=X)['phi1d'].iloc[5:-5], data['phi1d'].iloc[5:-5].to_numpy()/2, atol=0.005)
+
+
+def test_lowpass_transformer_other_fs(data):
+    trans = LowpassFilterDerivatorTransformer(cutoff=2, minimum_score=0.9)
+    trans.fit(X=data)
+    fs, sos = trans.fs_, trans.sos_
+
+    # Same time step but another start time (fs differs by round off), the fitted filter is used:
+    X = data.copy()
+    X.index = X.index + 0.37
+    trans.transform(X=X)
+    assert trans._sos(fs=(len(X) - 1)/(X.index[-1] - X.index[0])) is sos
+
+    # Another time step, the fitted filter is not changed:
+    X.index = X.index*2
+    trans.transform(X=X)
+    assert trans.fs_ == fs
+    assert trans.sos_ is sos
+    assert trans._sos(fs=fs/2) is trans._sos(fs=fs/2*(1 + 1e-14))
+
+
+@pytest.mark.parametrize("trans", [
+    CutTransformer(phi_max=np.deg2rad(5), phi1d_start_tolerance=0.05),
+    LowpassFilterDerivatorTransformer(cutoff=2, minimum_score=0.9),
+    ScaleFactorTransformer(scale_factor=30),
+])
+def test_transform_fast(data, trans):
+
+    with pytest.raises(NotFittedError):
+        trans.transform(X=data)
+
+    trans.fit(X=data)
+    pd.testing.assert_frame_equal(trans.transform_fast(X=data), trans.transform(X=data))
+
+
+@pytest.mark.parametrize("trans", [
+    LowpassFilterDerivatorTransformer(cutoff=2, minimum_score=0.9),
+    ScaleFactorTransformer(scale_factor=30),
+])
+def test_transform_does_not_change_X(data, trans):
+    X = data
+    X_original = X.copy()
+
+    trans.fit(X=X)
+    X_trans = trans.transform(X=X)
+    X_trans.iloc[:, :] = 1.0
+
+    pd.testing.assert_frame_equal(X, X_original)
+
+
+def test_add_derivatives_does_not_change_X(data):
+    trans = LowpassFilterDerivatorTransformer(cutoff=2, minimum_score=0.9)
+    trans.fit(X=data)
+    X = trans.transform(X=data)
+    X_original = X.copy()
+
+    X_derivatives = trans.add_derivatives(X=X)
+    X_derivatives.iloc[:, :] = 1.0
+
+    pd.testing.assert_frame_equal(X, X_original)
+
+
+def test_lowpass_transformer_keeps_dtype(data):
+    trans = LowpassFilterDerivatorTransformer(cutoff=2, minimum_score=0.9)
+    X_32 = trans.fit_transform(X=data.astype(np.float32))
+    assert all(X_32[key].dtype == np.float32 for key in ['phi_filtered', 'phi1d', 'phi2d'])
+
+    # Fitted on float32, but float64 input is not cast down:
+    X_64 = trans.transform(X=data)
+    assert all(X_64[key].dtype == np.float64 for key in ['phi_filtered', 'phi1d', 'phi2d'])
+
+
+def test_add_derivatives_non_uniform_time():
+    t = np.cumsum(np.linspace(0.05, 0.15, 200))
+    X = pd.DataFrame({'phi': np.sin(t), 'phi_filtered': np.sin(t)}, index=t)
+
+    trans = LowpassFilterDerivatorTransformer()
+    X_derivatives = trans.add_derivatives(X=X)
+    phi1d = np.gradient(X['phi_filtered'].to_numpy(), t)
+    assert_allclose(X_derivatives['phi1d'], phi1d)
+    assert_allclose(X_derivatives['phi2d'], np.gradient(phi1d, t))
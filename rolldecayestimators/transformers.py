@@ -1,3 +1,4 @@
+import warnings
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.base import BaseEstimator, TransformerMixin
@@ -7,7 +8,6 @@ import pandas as pd
 
 import rolldecayestimators.filters
 import rolldecayestimators.measure as measure
-from sklearn.metrics import r2_score
 
 class CutTransformer(BaseEstimator, TransformerMixin):
     """ Rolldecay transformer that cut time series from roll decay test for estimator.
@@ -52,11 +52,12 @@ class CutTransformer(BaseEstimator, TransformerMixin):
 
         self.n_features_ = X.shape[1]
 
-        phi = X[self.phi_key]
-        if (self.phi_max < phi.abs().min()):
+        phi = X[self.phi_key].to_numpy()
+        phi_abs = np.abs(phi)
+        if (self.phi_max < phi_abs.min()):
             raise ValueError('"phi_max" is too small')
 
-        if (self.phi_min > phi.abs().max()):
+        if (self.phi_min > phi_abs.max()):
             raise ValueError('"phi_min" is too large')
 
         if not isinstance(self.remove_end_samples,int):
@@ -94,53 +95,82 @@ class CutTransformer(BaseEstimator, TransformerMixin):
         #    raise ValueError('Shape of input is different from what was seen'
         #                     'in `fit`')
 
-        #Remove initial part (by removing first to maximums):
-        phi = X[self.phi_key]
-        index = phi.abs().idxmax()
-        X_cut = X.loc[index:].copy()
+        return self.transform_fast(X)
 
-        if (len(X_cut) > 10*self.remove_end_samples):
-            X_cut = X_cut.iloc[0:-self.remove_end_samples]
+    def transform_fast(self, X):
+        """
+        Same as transform, but without checking that fit has been called (for many calls in a loop).
+        """
+        t = X.index.to_numpy()
+        phi = X[self.phi_key].to_numpy()  # (in its own dtype: float32 stays float32 and float64 is never cast down)
+        t_start, t_stop = self.transform_array(t=t, phi=phi, phi1d=X['phi1d'].to_numpy())
 
-        phi = X_cut[self.phi_key]
-        phi_max_sign = np.sign(phi.loc[index])
-        if phi_max_sign == 1:
-            index2 = phi.idxmin()
-        else:
-            index2 = phi.idxmax()
+        # (the time is increasing, so the cut is one slice by position instead of a boolean mask over the index)
+        start = np.searchsorted(t, t_start, side='left')
+        stop = np.searchsorted(t, t_stop, side='right')
+        X_cut=X.iloc[start:stop].copy()  # (one copy: the slice can be a view of X with pandas<3)
 
-        X_cut = X_cut.loc[index2:].copy()
+        return X_cut
 
-        X_interpolated = measure.sample_increase(X=X_cut, increase=5)
-        X_zerocrossings = measure.get_peaks(X=X_interpolated)
-        mask = X_interpolated.index >= X_zerocrossings.index[0]
-        X_interpolated = X_interpolated.loc[mask]
+    def transform_array(self, t:np.ndarray, phi:np.ndarray, phi1d:np.ndarray)->tuple:
+        """
+        The cut done on numpy arrays, used by transform.
 
-        # Remove some large angles at start
-        mask = X_zerocrossings['phi'].abs() < self.phi_max
-        X_zerocrossings2 = X_zerocrossings.loc[mask].copy()
-        if len(X_zerocrossings2) > 0:
-            mask2 = X_interpolated.index > X_zerocrossings2.index[0]
-            X_interpolated = X_interpolated.loc[mask2]
+        Parameters
+        ----------
+        t : array
+            time [s] (increasing)
+        phi : array
+            roll angle [rad]
+        phi1d : array
+            roll velocity [rad/s]
 
+        Returns
+        -------
+        t_start, t_stop : float
+            The cut is all samples between t_start and t_stop (including both)
+        """
+
+        #Remove initial part (by removing first to maximums):
+        # (positions in the numpy array are used instead of index labels)
+        i0 = int(np.abs(phi).argmax())
+        stop = len(phi)
+        if (stop - i0 > 10*self.remove_end_samples):
+            stop -= self.remove_end_samples
+
+        if phi[i0] > 0:
+            i1 = i0 + int(phi[i0:stop].argmin())
+        else:
+            i1 = i0 + int(phi[i0:stop].argmax())
+
+        t_interpolated, phi1d_interpolated, t_peaks, phi_peaks = measure.get_peaks_array(t=t[i1:stop],
+                                                                                         phi=phi[i1:stop],
+                                                                                         phi1d=phi1d[i1:stop],
+                                                                                         increase=5)
+        # (t_interpolated is increasing, so the cuts can be found with searchsorted instead of masks)
+        start = np.searchsorted(t_interpolated, t_peaks[0], side='left')
+        end = len(t_interpolated)
+
+        # Remove some large angles at start
+        # (only the first peak below each limit is needed: argmax of the boolean array finds it)
+        phi_peaks = np.abs(phi_peaks)
+        small_peaks = phi_peaks < self.phi_max
+        if small_peaks.any():
+            start = np.searchsorted(t_interpolated, t_peaks[small_peaks.argmax()], side='right')
 
         # Remove some small angles at end
-        mask = X_zerocrossings2['phi'].abs() < self.phi_min
-        X_zerocrossings3 = X_zerocrossings2.loc[mask].copy()
-        if len(X_zerocrossings3) > 0:
-            mask3 = X_interpolated.index < X_zerocrossings3.index[0]
-            X_interpolated = X_interpolated.loc[mask3]
+        smaller_peaks = small_peaks & (phi_peaks < self.phi_min)
+        if smaller_peaks.any():
+            end = np.searchsorted(t_interpolated, t_peaks[smaller_peaks.argmax()], side='left')
 
-        if 'phi1d' in X_cut:
-            phi1d_start = np.abs(X_interpolated.iloc[0]['phi1d'])
-        
-            if phi1d_start > self.phi1d_start_tolerance:
-                raise ValueError('Start phi1d exceeds phi1d_start_tolerance (%f > %f)' % (phi1d_start, self.phi1d_start_tolerance) )
+        if start >= end:
+            raise ValueError('Nothing is left after the cut (phi_max:%f, phi_min:%f)' % (self.phi_max, self.phi_min))
 
-        mask = ((X_cut.index >= X_interpolated.index[0]) & (X_cut.index <= X_interpolated.index[-1]))
-        X_cut=X_cut.loc[mask].copy()
+        phi1d_start = np.abs(phi1d_interpolated[start])
+        if phi1d_start > self.phi1d_start_tolerance:
+            raise ValueError('Start phi1d exceeds phi1d_start_tolerance (%f > %f)' % (phi1d_start, self.phi1d_start_tolerance) )
 
-        return X_cut
+        return t_interpolated[start], t_interpolated[end-1]
 
 class LowpassFilterDerivatorTransformer(BaseEstimator, TransformerMixin):
     """ Rolldecay transformer that lowpass filters the roll signal for estimator.
@@ -157,6 +187,10 @@ class LowpassFilterDerivatorTransformer(BaseEstimator, TransformerMixin):
     ----------
     n_features_ : int
         The number of features of the data passed to :meth:`fit`.
+    fs_ : float
+        Sampling frequency [Hz] that the filter is designed for
+    sos_ : ndarray
+        Butterworth filter as second order sections
     """
     def __init__(self, cutoff=0.5, order=5, minimum_score=0.999):
         self.cutoff = cutoff
@@ -187,6 +221,13 @@ class LowpassFilterDerivatorTransformer(BaseEstimator, TransformerMixin):
 
         self.n_features_ = X.shape[1]
 
+        t = X.index.to_numpy()
+        ts = (t[-1] - t[0]) / (len(t) - 1)  # mean time step
+        if np.max(np.abs(np.diff(t) - ts)) > 0.01*ts:
+            warnings.warn('The time step is not constant, the filter and derivatives assume a time step of %f s' % ts)
+
+        self.design_filter(fs=1 / ts)
+
         assert self.score(X=X) > self.minimum_score
 
         # Return the transformer
@@ -207,7 +248,7 @@ class LowpassFilterDerivatorTransformer(BaseEstimator, TransformerMixin):
             in ``X``.
         """
         # Check is fit had been called
-        check_is_fitted(self, 'n_features_')
+        check_is_fitted(self, 'sos_')
 
         # Input validation
         #X = check_array(X, accept_sparse=True)
@@ -218,19 +259,96 @@ class LowpassFilterDerivatorTransformer(BaseEstimator, TransformerMixin):
         #    raise ValueError('Shape of input is different from what was seen'
         #                     'in `fit`')
 
+        return self.transform_fast(X)
+
+    def transform_fast(self, X):
+        """
+        Same as transform, but without checking that fit has been called (for many calls in a loop).
+        """
         # Lowpass filter the signal:
-        self.X = X.copy()
-        self.X_filter = X.copy()
-        ts = np.mean(np.diff(self.X_filter.index))
-        fs = 1 / ts
-        self.X_filter[self.phi_filtered_key] = rolldecayestimators.filters.lowpass_filter(data=self.X_filter['phi'],
-                                                                                     cutoff=self.cutoff, fs=fs,
-                                                                                     order=self.order)
+        self.X = X  # (X is not changed, so no copy is needed for plot_filtering)
+        phi = X[self.phi_key].to_numpy()  # (in its own dtype: float32 stays float32 and float64 is never cast down)
+        phi_filtered, phi1d, phi2d = self.transform_array(t=X.index.to_numpy(), phi=phi)
 
-        self.X_filter = self.add_derivatives(X=self.X_filter)
+        # (the three new columns come from the one array from lowpass_filter_and_derivatives, float32 if phi is)
+        self.X_filter = X.assign(**{
+            self.phi_filtered_key: phi_filtered,
+            self.phi1d_key: phi1d,
+            self.phi2d_key: phi2d,
+        })
 
         return self.X_filter
 
+    def transform_array(self, t:np.ndarray, phi:np.ndarray)->tuple:
+        """
+        The filtering and derivation done on numpy arrays, used by transform.
+
+        Parameters
+        ----------
+        t : array
+            time [s] (constant time step)
+        phi : array
+            roll angle [rad]
+
+        Returns
+        -------
+        phi_filtered, phi1d, phi2d : ndarray
+            filtered roll angle [rad], roll velocity [rad/s] and roll acceleration [rad/s2]
+        """
+        ts = (t[-1] - t[0]) / (len(t) - 1)  # mean time step
+        sos = self._sos(fs=1 / ts)
+
+        # Filtering and derivatives in one call (compiled if numba is installed):
+        return rolldecayestimators.filters.lowpass_filter_and_derivatives(data=phi, sos=sos, dt=ts)
+
+    def transform_batch(self, signals:list, dt:float)->list:
+        """
+        transform_array for many roll signals with the same time step (for instance many roll decay tests in a grid
+        search), filtered in parallel over the signals if numba is installed.
+
+        Parameters
+        ----------
+        signals : list
+            roll angles [rad] (arrays of any lengths)
+        dt : float
+            time step [s]
+
+        Returns
+        -------
+        results : list
+            (phi_filtered, phi1d, phi2d) for each signal
+        """
+        check_is_fitted(self, 'sos_')
+
+        sos = self._sos(fs=1 / dt)
+        return rolldecayestimators.filters.lowpass_filter_and_derivatives_batch(signals=signals, sos=sos, dt=dt)
+
+    def design_filter(self, fs):
+        """
+        Design the Butterworth filter for sampling frequency fs [Hz] (in fit, the filter is reused by transform as long
+        as the sampling frequency is the same)
+        """
+        self.fs_ = fs
+        self.sos_ = rolldecayestimators.filters.butter_lowpass_sos(cutoff=self.cutoff, fs=fs, order=self.order)
+        self._sos_other_fs = {}
+
+    def _sos(self, fs):
+        """
+        Filter for sampling frequency fs [Hz]: sos_ if fs is the same as fs_ (within round off), otherwise a filter
+        designed for fs that is kept in a dict with fs (rounded) as key. fs_ and sos_ are not changed after fit.
+        """
+        if np.isclose(fs, self.fs_, rtol=1e-9, atol=0):
+            return self.sos_
+
+        fs = round(fs, 6)
+        sos_other_fs = getattr(self, '_sos_other_fs', None)
+        if sos_other_fs is None:  # (missing in pickles from before the dict)
+            sos_other_fs = self._sos_other_fs = {}
+        if not fs in sos_other_fs:
+            sos_other_fs[fs] = rolldecayestimators.filters.butter_lowpass_sos(cutoff=self.cutoff, fs=fs,
+                                                                              order=self.order)
+        return sos_other_fs[fs]
+
     def plot_filtering(self):
 
         fig, axes = plt.subplots(nrows=3)
@@ -248,13 +366,23 @@ class LowpassFilterDerivatorTransformer(BaseEstimator, TransformerMixin):
         self.X_filter.plot(y='phi2d', ax=ax, style='--')
         ax.legend();
 
-    def add_derivatives(self, X):
+    def add_derivatives(self, X, dt=None):
         # Add accelerations:
         assert self.phi_key in X
-        X = X.copy()
-        X[self.phi1d_key] = np.gradient(X[self.phi_filtered_key].values, X.index.values)
-        X[self.phi2d_key] = np.gradient(X[self.phi1d_key].values, X.index.values)
-        return X
+        if dt is None:
+            # (any time steps, from the index)
+            t = X.index.to_numpy()
+            phi1d = np.gradient(X[self.phi_filtered_key].to_numpy(), t)
+            phi2d = np.gradient(phi1d, t)
+        else:
+            # (constant time step dt, so the central differences can be calculated without the index)
+            phi1d = rolldecayestimators.filters.derivative(X[self.phi_filtered_key].to_numpy(), dt=dt)
+            phi2d = rolldecayestimators.filters.derivative(phi1d, dt=dt)
+
+        return X.assign(**{
+            self.phi1d_key: phi1d,
+            self.phi2d_key: phi2d,
+        })
 
     def score(self, X, y=None, sample_weight=None):
         """
@@ -284,10 +412,10 @@ class LowpassFilterDerivatorTransformer(BaseEstimator, TransformerMixin):
 
         """
         X_filter = self.transform(X)
-        y_true = X[self.phi_key]
-        y_pred = X_filter[self.phi_filtered_key]
+        y_true = X[self.phi_key].to_numpy()
+        y_pred = X_filter[self.phi_filtered_key].to_numpy()
 
-        return r2_score(y_true=y_true, y_pred=y_pred)
+        return rolldecayestimators.filters.r2_score(y_true=y_true, y_pred=y_pred)
 
 class ScaleFactorTransformer(BaseEstimator, TransformerMixin):
     """ Rolldecay to full scale using scale factor
@@ -304,6 +432,9 @@ class ScaleFactorTransformer(BaseEstimator, TransformerMixin):
     ----------
     n_features_ : int
         The number of features of the data passed to :meth:`fit`.
+    time_factor_, velocity_factor_, acceleration_factor_ : float
+        Factors multiplied to time, roll velocity and roll acceleration: sqrt(scale_factor), 1/sqrt(scale_factor)
+        and 1/scale_factor
     """
     def __init__(self, scale_factor):
         self.scale_factor = scale_factor
@@ -333,6 +464,11 @@ class ScaleFactorTransformer(BaseEstimator, TransformerMixin):
         if pd.isnull(self.scale_factor):
             raise ValueError('Bad scale factor:%s' % self.scale_factor)
 
+        # Froude scaling of time, velocity and acceleration:
+        self.time_factor_ = np.sqrt(self.scale_factor)
+        self.velocity_factor_ = 1/self.time_factor_
+        self.acceleration_factor_ = 1/self.scale_factor
+
         # Return the transformer
         return self
 
@@ -351,7 +487,7 @@ class ScaleFactorTransformer(BaseEstimator, TransformerMixin):
             in ``X``.
         """
         # Check is fit had been called
-        check_is_fitted(self, 'n_features_')
+        check_is_fitted(self, 'time_factor_')
 
         # Input validation
         #X = check_array(X, accept_sparse=True)
@@ -362,18 +498,56 @@ class ScaleFactorTransformer(BaseEstimator, TransformerMixin):
         #    raise ValueError('Shape of input is different from what was seen'
         #                     'in `fit`')
 
+        return self.transform_fast(X)
 
-        X_scaled = X.copy()
-        X_scaled.index*=np.sqrt(self.scale_factor)  # To full scale
-        if self.phi1d_key in X:
-            X_scaled[self.phi1d_key]/=np.sqrt(self.scale_factor)
+    def transform_fast(self, X):
+        """
+        Same as transform, but without checking that fit has been called (for many calls in a loop).
+        """
+        t, phi1d, phi2d = self.transform_array(t=X.index.to_numpy(),
+                                               phi1d=X[self.phi1d_key].to_numpy() if self.phi1d_key in X else None,
+                                               phi2d=X[self.phi2d_key].to_numpy() if self.phi2d_key in X else None)
 
-        if self.phi2d_key in X:
-            X_scaled[self.phi2d_key]/=self.scale_factor
+        # Only the scaled columns are new arrays, the other columns are not copied:
+        scaled_columns = {}
+        if phi1d is not None:
+            scaled_columns[self.phi1d_key] = phi1d
 
+        if phi2d is not None:
+            scaled_columns[self.phi2d_key] = phi2d
+
+        X_scaled = X.assign(**scaled_columns)
+        X_scaled.index = pd.Index(t, name=X.index.name)  # To full scale
 
         return X_scaled
 
+    def transform_array(self, t:np.ndarray, phi1d:np.ndarray=None, phi2d:np.ndarray=None)->tuple:
+        """
+        The scaling done on numpy arrays, used by transform.
+
+        Parameters
+        ----------
+        t : array
+            time [s]
+        phi1d : array, optional
+            roll velocity [rad/s]
+        phi2d : array, optional
+            roll acceleration [rad/s2]
+
+        Returns
+        -------
+        t, phi1d, phi2d : ndarray
+            in full scale (phi1d and phi2d are None if they are not given)
+        """
+        t = t*self.time_factor_
+        if phi1d is not None:
+            phi1d = phi1d*self.velocity_factor_
+
+        if phi2d is not None:
+            phi2d = phi2d*self.acceleration_factor_
+
+        return t, phi1d, phi2d
+
 class OffsetTransformer(BaseEstimator, TransformerMixin):
     """ Rolldecay remove offset in signal
 